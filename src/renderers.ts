@@ -0,0 +1,39 @@
+import type { Question } from "@/types/test"
+import type { HLJSApi } from "highlight.js"
+import type katexApi from "katex"
+import { shallowRef } from "vue"
+
+// Bit flags of the hex digits in Question.render, written by tools/format_code_blocks.py
+export const RenderFlag = {
+  InlineMath: 1,
+  DisplayMath: 2,
+  CodeBlock: 4,
+  Image: 8
+} as const
+
+export const MATH_FLAGS = RenderFlag.InlineMath | RenderFlag.DisplayMath
+
+// KaTeX and highlight.js are only downloaded once a text needs them
+export const katex = shallowRef<typeof katexApi | null>(null)
+export const hljs = shallowRef<HLJSApi | null>(null)
+
+let katexLoading: Promise<void> | undefined
+let hljsLoading: Promise<void> | undefined
+
+export function loadKatex(): void {
+  katexLoading ??= import("katex").then((module) => {
+    katex.value = module.default
+  })
+}
+
+export function loadHljs(): void {
+  hljsLoading ??= import("highlight.js/lib/common").then((module) => {
+    hljs.value = module.default
+  })
+}
+
+// Flags of the question text (index 0) or of option index - 1, or undefined without hints
+export function renderFlags(question: Question, index: number): number | undefined {
+  const digit = question.render?.[index]
+  return digit === undefined ? undefined : parseInt(digit, 16)
+}
@@ -1,8 +1,26 @@
+export interface RenderedHtml {
+  question: string | null
+  options: (string | null)[]
+}
+
+export interface ImageVariants {
+  width: number
+  height: number
+  variants: Partial<Record<"avif" | "webp", number[]>>
+}
+
+// src/data/shards/index.json, written by tools/shard_by_year.py: the years each test has a shard for
+export type ShardIndex = Record<string, { total: number; years: Record<string, number> }>
+
 export interface Question {
   id: number
+  // Stable content hash written by tools/deduplicator.py, unlike the positional id
+  uid?: string
   question: string
   options: string[]
   correctAnswer: number
   image?: string
-  tags: string[]
+  tags?: string[]
+  render?: string
+  html?: RenderedHtml
 }
@@ -1,3 +1,5 @@
+import type { Question } from "@/types/test"
+
 export function shuffle<T>(array: T[]): T[] {
   let currentIndex = array.length,
     randomIndex
@@ -12,3 +14,30 @@ export function shuffle<T>(array: T[]): T[] {
 
   return array
 }
+
+export async function withPrerenderedHtml(
+  testId: string,
+  questions: Question[],
+  shardYear?: string
+): Promise<Question[]> {
+  let rendered: Map<string, string>
+  try {
+    // A year shard has its own map, so it does not load the HTML of the whole test
+    const module = shardYear
+      ? await import(`@/data/rendered/shards/${testId}/${shardYear}.json`)
+      : await import(`@/data/rendered/${testId}.json`)
+    rendered = new Map(Object.entries(module.default as Record<string, string>))
+  } catch {
+    // Not pre-rendered (tools/prerender.py not run): TextRenderer renders in the browser
+    return questions
+  }
+
+  return questions.map((question) => {
+    const html = {
+      question: rendered.get(question.question) ?? null,
+      options: question.options.map((option) => rendered.get(option) ?? null)
+    }
+    const hasHtml = html.question !== null || html.options.some((option) => option !== null)
+    return hasHtml ? { ...question, html } : question
+  })
+}
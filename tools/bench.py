@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+
+import argparse
+import importlib
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows: peak RSS is reported as null there
+    resource = None
+
+import deduplicator
+import format_code_blocks
+
+parse_netlify = importlib.import_module('parse-netlify')
+
+RESULTS_FORMAT = 1
+DEFAULT_OUTPUT = Path(__file__).parent.absolute() / '.bench' / 'latest.json'
+DEFAULT_SIZES = [10**3, 10**4, 10**5, 10**6]
+
+WORDS = (
+    "algoritmo árbol nodo grafo pila cola vector memoria proceso hilo función clase "
+    "objeto puntero referencia complejidad coste recursión iteración bucle tabla "
+    "índice clave valor red paquete protocolo capa enlace trama servidor cliente "
+    "petición respuesta caché disco bloque página fichero sistema núcleo usuario"
+).split()
+
+LATEX_SNIPPETS = [
+    r"$O(n \log n)$", r"$\Theta(n^2)$", r"$\sum_{i=1}^{n} i$", r"$T(n) = 2T(n/2) + n$",
+    r"$\frac{n(n+1)}{2}$", r"$2^{k}$", r"$\Omega(1)$",
+]
+
+MONTHS = ['Enero', 'Febrero', 'Junio', 'Julio', 'Septiembre', 'Diciembre']
+
+@dataclass
+class CorpusConfig:
+    """Shape of a synthetic question set"""
+    duplicate_rate: float = 0.1
+    latex_density: float = 0.3
+    cpp_density: float = 0.1
+    seed: int = 1
+
+def random_sentence(rng: random.Random, min_words: int, max_words: int) -> str:
+    words = rng.choices(WORDS, k=rng.randint(min_words, max_words))
+    return ' '.join(words).capitalize()
+
+def random_cpp_block(rng: random.Random) -> str:
+    """A small, deliberately badly formatted C++ snippet"""
+    name = rng.choice(WORDS[:12]).replace('á', 'a').replace('ó', 'o').replace('ú', 'u')
+    bound = rng.randint(2, 100)
+    return (
+        "```cpp\n"
+        f"int {name}(int n){{\n"
+        f"  int s=0;for(int i=0;i<n;i++){{ if(i%{bound}==0) s+=i; }}\n"
+        "return s;}\n"
+        "```"
+    )
+
+def generate_questions(size: int, config: CorpusConfig) -> List[Dict[str, Any]]:
+    """
+    Generate `size` questions in the src/data schema. About duplicate_rate of them
+    repeat an earlier question with reordered options, different spacing and case,
+    and their own tag; latex_density and cpp_density control the share of questions
+    with $...$ math and ```cpp blocks. The same config always yields the same corpus.
+    """
+    rng = random.Random(config.seed)
+    questions: List[Dict[str, Any]] = []
+
+    for position in range(size):
+        tag = f"{rng.choice(MONTHS)} {rng.randint(2015, 2025)}"
+
+        if questions and rng.random() < config.duplicate_rate:
+            original = rng.choice(questions)
+            order = list(range(len(original['options'])))
+            rng.shuffle(order)
+            questions.append({
+                'id': position + 1,
+                'question': '  ' + original['question'].upper(),
+                'options': [original['options'][i] for i in order],
+                'correctAnswer': order.index(original['correctAnswer']),
+                'tags': [tag],
+            })
+            continue
+
+        text = random_sentence(rng, 6, 20) + ' ' + str(position)
+        if rng.random() < config.latex_density:
+            text += ' ' + rng.choice(LATEX_SNIPPETS)
+        text += '?'
+        if rng.random() < config.cpp_density:
+            text += '\n\n' + random_cpp_block(rng)
+
+        options = []
+        for _ in range(4):
+            option = random_sentence(rng, 2, 8)
+            if rng.random() < config.latex_density:
+                option += ' ' + rng.choice(LATEX_SNIPPETS)
+            options.append(option)
+
+        questions.append({
+            'id': position + 1,
+            'question': text,
+            'options': options,
+            'correctAnswer': rng.randrange(4),
+            'tags': [tag],
+        })
+
+    return questions
+
+def raw_quiz_dump(questions: List[Dict[str, Any]]) -> str:
+    """Render questions in the line-based format parse-netlify.py reads"""
+    lines = []
+    for question in questions:
+        lines.append(' '.join(question['question'].split()))
+        lines.append(str(question['correctAnswer'] + 1))
+        lines.extend('- ' + ' '.join(option.split()) for option in question['options'])
+    return '\n'.join(lines) + '\n'
+
+def stub_formatter(code: str) -> str:
+    """Stands in for clang-format so only the text scanning is measured"""
+    return code.strip()
+
+def format_all_blocks(data: List[Dict[str, Any]]) -> None:
+    for question in data:
+        for text in format_code_blocks.question_texts(question):
+            format_code_blocks.format_code_blocks_in_text(text, stub_formatter)
+
+# name -> (setup: corpus -> input, run: input -> anything); only run is timed
+BENCHMARKS: Dict[str, Tuple[Callable[[List[Dict[str, Any]]], Any], Callable[[Any], Any]]] = {
+    'parse_json': (lambda data: data, deduplicator.TestParser.parse_json),
+    'remove_duplicates': (deduplicator.TestParser.parse_json, deduplicator.TestDeduplicator.remove_duplicates),
+    'format_code_blocks': (lambda data: data, format_all_blocks),
+    'parse_quiz_data': (raw_quiz_dump, parse_netlify.parse_quiz_data),
+}
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process so far"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def run_case(name: str, size: int, config: CorpusConfig, repeat: int) -> Dict[str, Any]:
+    """
+    Time one benchmark at one corpus size. Runs in a fresh process, so the
+    peak RSS belongs to this case alone.
+    """
+    setup, run = BENCHMARKS[name]
+    argument = setup(generate_questions(size, config))
+    rss_before = peak_rss_bytes()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run(argument)
+        timings.append(time.perf_counter() - start)
+
+    rss_after = peak_rss_bytes()
+    wall = statistics.median(timings)
+    return {
+        "benchmark": name,
+        "questions": size,
+        "wall_s": wall,
+        "min_wall_s": min(timings),
+        "questions_per_s": size / wall if wall > 0 else None,
+        "peak_rss_bytes": rss_after,
+        "rss_growth_bytes": rss_after - rss_before if rss_after is not None else None,
+    }
+
+def run_isolated(name: str, size: int, config: CorpusConfig, repeat: int) -> Dict[str, Any]:
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+        return executor.submit(run_case, name, size, config, repeat).result()
+
+def format_size(num_bytes: Optional[int]) -> str:
+    if num_bytes is None:
+        return "n/a"
+    return f"{num_bytes / (1024 * 1024):.1f} MB"
+
+def compare_to_baseline(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Compare results against a stored results file. A case regresses when its
+    throughput (from the best of its timed runs) drops, or its peak RSS grows,
+    by more than `tolerance`.
+    Returns a description of every regression.
+    """
+    previous = {(r["benchmark"], r["questions"]): r for r in baseline.get("results", [])}
+    regressions = []
+
+    for result in results["results"]:
+        old = previous.get((result["benchmark"], result["questions"]))
+        if old is None:
+            continue
+        label = f"{result['benchmark']} @ {result['questions']:,}"
+
+        # Best-of-repeats is far less noisy than the median on a busy machine
+        if old.get("min_wall_s") and result["min_wall_s"] > 0:
+            ratio = old["min_wall_s"] / result["min_wall_s"]
+            if ratio < 1 - tolerance:
+                regressions.append(f"{label}: best time {old['min_wall_s'] * 1000:.1f} → "
+                                   f"{result['min_wall_s'] * 1000:.1f} ms ({(ratio - 1) * 100:+.1f}% throughput)")
+
+        if old.get("peak_rss_bytes") and result["peak_rss_bytes"] is not None:
+            ratio = result["peak_rss_bytes"] / old["peak_rss_bytes"]
+            if ratio > 1 + tolerance:
+                regressions.append(f"{label}: peak RSS {format_size(old['peak_rss_bytes'])} → "
+                                   f"{format_size(result['peak_rss_bytes'])} ({(ratio - 1) * 100:+.1f}%)")
+
+    return regressions
+
+def write_results(path: Path, results: Dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+        f.write('\n')
+
+def main():
+    """Main function to benchmark the data tools on synthetic corpora"""
+    parser = argparse.ArgumentParser(description="Benchmark the data tools on synthetic question sets")
+    parser.add_argument('--sizes', type=lambda value: int(float(value)), nargs='+', default=DEFAULT_SIZES,
+                        help="corpus sizes in questions (default: 1e3 1e4 1e5 1e6)")
+    parser.add_argument('--benchmarks', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS),
+                        help="benchmarks to run (default: all)")
+    parser.add_argument('--duplicate-rate', type=float, default=CorpusConfig.duplicate_rate,
+                        help="share of questions that repeat an earlier one (default: %(default)s)")
+    parser.add_argument('--latex-density', type=float, default=CorpusConfig.latex_density,
+                        help="share of questions and options with $...$ math (default: %(default)s)")
+    parser.add_argument('--cpp-density', type=float, default=CorpusConfig.cpp_density,
+                        help="share of questions with a ```cpp block (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=CorpusConfig.seed,
+                        help="random seed of the corpus generator (default: %(default)s)")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="timed runs per case; the median is reported (default: %(default)s)")
+    parser.add_argument('--output', type=Path, default=DEFAULT_OUTPUT,
+                        help="where to write the JSON results (default: tools/.bench/latest.json)")
+    parser.add_argument('--baseline', type=Path,
+                        help="results file to compare against; exits with status 1 on a regression")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="allowed relative slowdown or memory growth before a regression (default: %(default)s)")
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="store these results as the new --baseline instead of comparing")
+    args = parser.parse_args()
+
+    if args.update_baseline and args.baseline is None:
+        parser.error("--update-baseline requires --baseline")
+
+    config = CorpusConfig(args.duplicate_rate, args.latex_density, args.cpp_density, args.seed)
+    results: Dict[str, Any] = {
+        "format": RESULTS_FORMAT,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "corpus": asdict(config),
+        "repeat": args.repeat,
+        "results": [],
+    }
+
+    print(f"Benchmarking {len(args.benchmarks)} benchmark(s) at {len(args.sizes)} size(s)")
+    for size in args.sizes:
+        print(f"\nCorpus: {size:,} questions")
+        for name in args.benchmarks:
+            result = run_isolated(name, size, config, args.repeat)
+            results["results"].append(result)
+            throughput = result["questions_per_s"]
+            print(f"  ⏱️  {name:<20} {result['wall_s'] * 1000:10.1f} ms  "
+                  f"{throughput or 0:>12,.0f} q/s  peak {format_size(result['peak_rss_bytes'])}")
+
+    write_results(args.output, results)
+
+    regressions = []
+    if args.baseline is not None:
+        if args.update_baseline:
+            write_results(args.baseline, results)
+        elif args.baseline.exists():
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+            if baseline.get("corpus") != results["corpus"]:
+                print(f"\nWarning: {args.baseline} was recorded with a different corpus configuration")
+            regressions = compare_to_baseline(results, baseline, args.tolerance)
+        else:
+            print(f"\nWarning: baseline '{args.baseline}' not found, nothing to compare")
+
+    print(f"\n{'='*50}")
+    print(f"SUMMARY:")
+    print(f"Cases run: {len(results['results'])}")
+    print(f"Results written to: {args.output}")
+    if args.update_baseline:
+        print(f"Baseline updated: {args.baseline}")
+    elif args.baseline is not None:
+        print(f"Regressions against {args.baseline.name}: {len(regressions)}")
+        for regression in regressions:
+            print(f"  ❌ {regression}")
+    print(f"{'='*50}")
+
+    if regressions:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
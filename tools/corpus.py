@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+
+import argparse
+import fnmatch
+import hashlib
+import json
+import sqlite3
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from deduplicator import TestDeduplicator, TestParser
+from manifest import file_digest, list_data_files
+
+# Bump whenever the schema or the meaning of a column changes: the cache is rebuilt
+CORPUS_FORMAT = 2
+
+DEFAULT_DB = Path(__file__).parent.absolute() / '.cache' / 'corpus.sqlite3'
+
+SCHEMA = """
+CREATE TABLE files (
+    name TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE questions (
+    file TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    id INTEGER,
+    uid TEXT,
+    question TEXT NOT NULL,
+    correct_answer INTEGER,
+    image TEXT,
+    render TEXT,
+    question_hash TEXT NOT NULL,
+    key_hash TEXT NOT NULL,
+    PRIMARY KEY (file, position)
+);
+CREATE INDEX questions_by_key ON questions (key_hash);
+CREATE TABLE options (
+    file TEXT NOT NULL,
+    question_position INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    PRIMARY KEY (file, question_position, position)
+);
+CREATE TABLE tags (
+    file TEXT NOT NULL,
+    question_position INTEGER NOT NULL,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (file, question_position, tag)
+);
+CREATE INDEX tags_by_tag ON tags (tag);
+"""
+
+# Full-text index over question and options, rowid = questions.rowid
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE questions_fts USING fts5(
+    question, options, tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+def text_hash(text: str) -> str:
+    """Short hash of an already normalized text"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+class Corpus:
+    """
+    SQLite cache of the question files, for queries that would otherwise
+    decode every JSON file. The JSON files stay the source of truth: each
+    file's rows are replaced whenever its content hash changes.
+    """
+
+    def __init__(self, path: Path = DEFAULT_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != CORPUS_FORMAT:
+            self._create()
+        self.has_fts = self.db.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'questions_fts'"
+        ).fetchone() is not None
+
+    def _create(self) -> None:
+        tables = [name for (name,) in self.db.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' AND name NOT LIKE '%fts_%'"
+        )]
+        with self.db:
+            for name in tables:
+                self.db.execute(f"DROP TABLE IF EXISTS {name}")
+            self.db.executescript(SCHEMA)
+            try:
+                self.db.executescript(FTS_SCHEMA)
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5: everything but search() still works
+                pass
+            self.db.execute(f"PRAGMA user_version = {CORPUS_FORMAT}")
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def _is_current(self, file_path: Path) -> bool:
+        """Whether the rows of file_path match its contents (mtime/size first, then the hash)"""
+        row = self.db.execute("SELECT sha256, mtime_ns, size FROM files WHERE name = ?", (file_path.name,)).fetchone()
+        if row is None:
+            return False
+        stat = file_path.stat()
+        if (stat.st_mtime_ns, stat.st_size) == (row[1], row[2]):
+            return True
+        if stat.st_size != row[2] or file_digest(file_path) != row[0]:
+            return False
+        self.db.execute("UPDATE files SET mtime_ns = ? WHERE name = ?", (stat.st_mtime_ns, file_path.name))
+        return True
+
+    def _delete_file(self, name: str) -> None:
+        if self.has_fts:
+            self.db.execute("DELETE FROM questions_fts WHERE rowid IN (SELECT rowid FROM questions WHERE file = ?)", (name,))
+        for table in ('questions', 'options', 'tags', 'files'):
+            column = 'name' if table == 'files' else 'file'
+            self.db.execute(f"DELETE FROM {table} WHERE {column} = ?", (name,))
+
+    def _load_file(self, file_path: Path) -> int:
+        """Replace the rows of one file. Returns its number of questions."""
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if not isinstance(data, list):
+            raise ValueError(f"{file_path.name} is not a list of questions")
+
+        stat = file_path.stat()
+        name = file_path.name
+        self._delete_file(name)
+        self.db.execute("INSERT INTO files VALUES (?, ?, ?, ?)",
+                        (name, file_digest(file_path), stat.st_mtime_ns, stat.st_size))
+
+        for position, question in enumerate(TestParser.parse_json(data)):
+            cursor = self.db.execute(
+                "INSERT INTO questions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (name, position, question.id, question.uid, question.question, question.correctAnswer,
+                 question.image, question.render, text_hash(question.normalized_question),
+                 TestDeduplicator.content_id(question))
+            )
+            self.db.executemany(
+                "INSERT INTO options VALUES (?, ?, ?, ?, ?)",
+                [(name, position, i, option, text_hash(normalized))
+                 for i, (option, normalized) in enumerate(zip(question.options, question.normalized_options))]
+            )
+            self.db.executemany(
+                "INSERT OR IGNORE INTO tags VALUES (?, ?, ?)",
+                [(name, position, tag) for tag in question.tags or ()]
+            )
+            if self.has_fts:
+                self.db.execute("INSERT INTO questions_fts (rowid, question, options) VALUES (?, ?, ?)",
+                                (cursor.lastrowid, question.question, '\n'.join(question.options)))
+
+        return len(data)
+
+    def refresh(self, data_dir: Path, verbose: bool = False) -> Tuple[int, int]:
+        """
+        Bring the cache in line with the question files of data_dir: reload the
+        files whose contents changed and drop the ones that are gone.
+        Returns (files_reloaded, files_removed).
+        """
+        files = list_data_files(data_dir)
+        reloaded = 0
+
+        with self.db:
+            for file_path in files:
+                if self._is_current(file_path):
+                    continue
+                try:
+                    count = self._load_file(file_path)
+                except (OSError, ValueError) as e:
+                    # json.JSONDecodeError is a ValueError
+                    self._delete_file(file_path.name)
+                    print(f"  ❌ Error loading {file_path.name} into the corpus: {e}")
+                    continue
+                reloaded += 1
+                if verbose:
+                    print(f"  ✅ Loaded {file_path.name} ({count} questions)")
+
+            names = {file_path.name for file_path in files}
+            stale = [name for (name,) in self.db.execute("SELECT name FROM files") if name not in names]
+            for name in stale:
+                self._delete_file(name)
+
+        return reloaded, len(stale)
+
+    def file_names(self, pattern: str = '*') -> List[str]:
+        """Names of the cached files matching a glob pattern such as 'ada-*'"""
+        return [name for (name,) in self.db.execute("SELECT name FROM files ORDER BY name")
+                if fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(Path(name).stem, pattern)]
+
+    def question_counts(self) -> Dict[str, Tuple[int, int]]:
+        """File name -> (questions, questions left once its duplicates are merged)"""
+        return {name: (total, unique) for name, total, unique in self.db.execute(
+            "SELECT file, COUNT(*), COUNT(DISTINCT key_hash) FROM questions GROUP BY file"
+        )}
+
+    def files_needing_dedupe(self) -> List[str]:
+        """
+        Files the deduplicator has to rewrite: some question appears more than
+        once, or has a missing or out-of-date content id
+        """
+        return [name for (name,) in self.db.execute(
+            """
+            SELECT file FROM questions GROUP BY file, key_hash HAVING COUNT(*) > 1
+            UNION
+            SELECT file FROM questions WHERE uid IS NOT key_hash
+            ORDER BY file
+            """
+        )]
+
+    def duplicate_groups(self, files: Optional[List[str]] = None) -> List[List[Tuple[str, int]]]:
+        """
+        Groups of questions sharing a deduplication key among `files` (default: all),
+        as (file, question id) locations in file and position order
+        """
+        names = files if files is not None else self.file_names()
+        marks = ','.join('?' * len(names))
+        rows = self.db.execute(
+            f"""
+            SELECT key_hash, file, id FROM questions
+            WHERE file IN ({marks}) AND key_hash IN (
+                SELECT key_hash FROM questions WHERE file IN ({marks})
+                GROUP BY key_hash HAVING COUNT(*) > 1
+            )
+            ORDER BY key_hash, file, position
+            """,
+            [*names, *names]
+        )
+        groups: Dict[str, List[Tuple[str, int]]] = {}
+        for key, file_name, question_id in rows:
+            groups.setdefault(key, []).append((file_name, question_id))
+        return sorted(groups.values())
+
+    def cross_file_groups(self) -> List[List[Tuple[str, int]]]:
+        """
+        Questions shared between files, one location per file (its first copy,
+        which is the one the deduplicator keeps), like GlobalDuplicateIndex
+        """
+        groups = []
+        for locations in self.duplicate_groups():
+            first: Dict[str, int] = {}
+            for file_name, question_id in locations:
+                first.setdefault(file_name, question_id)
+            if len(first) > 1:
+                groups.append(list(first.items()))
+        return groups
+
+    def also_appears_in(self) -> Dict[str, Dict[str, List[str]]]:
+        """The "also appears in" map of GlobalDuplicateIndex, computed from the cache"""
+        also_in: Dict[str, Dict[str, List[str]]] = {}
+        for locations in self.cross_file_groups():
+            test_ids = sorted({Path(file_name).stem for file_name, _ in locations})
+            for file_name, question_id in locations:
+                test_id = Path(file_name).stem
+                also_in.setdefault(test_id, {})[str(question_id)] = [other for other in test_ids if other != test_id]
+        return {test_id: also_in[test_id] for test_id in sorted(also_in)}
+
+    def questions_with_tag(self, tag: str) -> List[Tuple[str, int, str]]:
+        """(file, id, question) of the questions carrying a tag containing `tag`"""
+        return self.db.execute(
+            """
+            SELECT DISTINCT q.file, q.id, q.question FROM questions q
+            JOIN tags t ON t.file = q.file AND t.question_position = q.position
+            WHERE instr(t.tag, ?) > 0 ORDER BY q.file, q.position
+            """,
+            (tag,)
+        ).fetchall()
+
+    def questions_containing(self, text: str) -> List[Tuple[str, int, str]]:
+        """(file, id, question) of the questions whose text or options contain `text` verbatim"""
+        return self.db.execute(
+            """
+            SELECT q.file, q.id, q.question FROM questions q
+            WHERE instr(q.question, ?) > 0 OR EXISTS (
+                SELECT 1 FROM options o
+                WHERE o.file = q.file AND o.question_position = q.position AND instr(o.text, ?) > 0
+            )
+            ORDER BY q.file, q.position
+            """,
+            (text, text)
+        ).fetchall()
+
+    def search(self, query: str, limit: int = 50) -> List[Tuple[str, int, str]]:
+        """(file, id, question) of the best FTS5 matches of `query` (accents and case ignored)"""
+        if not self.has_fts:
+            raise RuntimeError("this SQLite build has no FTS5 support")
+        return self.db.execute(
+            """
+            SELECT q.file, q.id, q.question FROM questions_fts
+            JOIN questions q ON q.rowid = questions_fts.rowid
+            WHERE questions_fts MATCH ? ORDER BY rank LIMIT ?
+            """,
+            (query, limit)
+        ).fetchall()
+
+    def stats(self) -> Dict[str, int]:
+        counts = {}
+        for table in ('files', 'questions', 'options', 'tags'):
+            counts[table] = self.db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        return counts
+
+def print_questions(rows: List[Tuple[str, int, str]]) -> None:
+    for file_name, question_id, question in rows:
+        text = ' '.join(question.split())
+        print(f"  {file_name} #{question_id}: {text[:100]}{'…' if len(text) > 100 else ''}")
+    print(f"{len(rows)} question(s)")
+
+def main():
+    """Main function to refresh and query the corpus cache of ../src/data"""
+    script_dir = Path(__file__).parent.absolute()
+    data_dir = (script_dir / ".." / "src" / "data").resolve()
+
+    parser = argparse.ArgumentParser(description="Query the test data through an incrementally refreshed SQLite cache")
+    parser.add_argument('--db', type=Path, default=DEFAULT_DB,
+                        help="path of the cache database (default: tools/.cache/corpus.sqlite3)")
+    parser.add_argument('--tag', help="list the questions with a tag containing TAG (e.g. 2023)")
+    parser.add_argument('--contains', metavar='TEXT',
+                        help="list the questions whose text or options contain TEXT verbatim (e.g. ```cpp)")
+    parser.add_argument('--search', metavar='QUERY', help="full-text search (SQLite FTS5 query syntax)")
+    parser.add_argument('--duplicates', metavar='PATTERN', nargs='?', const='*',
+                        help="count duplicate questions among the files matching PATTERN (e.g. 'ada-*')")
+    args = parser.parse_args()
+
+    with Corpus(args.db) as corpus:
+        reloaded, removed = corpus.refresh(data_dir, verbose=True)
+        stats = corpus.stats()
+        print(f"Corpus: {stats['files']} files, {stats['questions']} questions "
+              f"({reloaded} file(s) reloaded, {removed} removed)")
+
+        if args.tag:
+            print(f"\nQuestions tagged '{args.tag}':")
+            print_questions(corpus.questions_with_tag(args.tag))
+        if args.contains:
+            print(f"\nQuestions containing '{args.contains}':")
+            print_questions(corpus.questions_containing(args.contains))
+        if args.search:
+            print(f"\nBest matches for '{args.search}':")
+            print_questions(corpus.search(args.search))
+        if args.duplicates:
+            files = corpus.file_names(args.duplicates)
+            groups = corpus.duplicate_groups(files)
+            cross_file = [locations for locations in groups if len({name for name, _ in locations}) > 1]
+            print(f"\nDuplicates among {', '.join(files) or 'no files'}:")
+            for locations in groups:
+                print(f"  🔗 {', '.join(f'{name} #{question_id}' for name, question_id in locations)}")
+            print(f"{len(groups)} group(s), {sum(len(locations) - 1 for locations in groups)} redundant "
+                  f"copies, {len(cross_file)} shared between files")
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,79 @@
 #!/usr/bin/env python3
 
+import argparse
+import hashlib
 import json
-import re
+import random
+import sys
+import unicodedata
+import zlib
+from functools import lru_cache, partial
 from pathlib import Path
-from dataclasses import dataclass, asdict
-from typing import List, Optional, Set, Tuple, Dict, Any
+from dataclasses import dataclass, asdict, field, replace
+from typing import List, Optional, Set, Tuple, Dict, Any, FrozenSet
 
-@dataclass
+import pyversion  # exits on Python < 3.10, before the imports that need it
+import profiling
+from manifest import Manifest, list_data_files
+from output import encode_questions, format_bytes_saved, write_if_changed
+from parallel import map_files
+
+# Bump whenever a change here can produce different output for the same input
+TOOL_VERSION = "4"
+
+# Number of distinct strings whose normalized form is remembered
+NORMALIZE_CACHE_SIZE = 1 << 16
+
+# Length of the content-derived question ids (hex digits of a SHA-256)
+CONTENT_ID_LENGTH = 16
+
+@dataclass(frozen=True, slots=True)
 class Question:
-    """Represents a test question"""
+    """
+    Represents a test question.
+    Immutable and slotted to stay small on large corpora: options and tags are
+    tuples (tags interned), and changed copies are made with dataclasses.replace,
+    which shares every field that did not change.
+    """
     id: int
     question: str
-    options: List[str]
+    options: Tuple[str, ...]
     correctAnswer: int
     image: Optional[str] = None
-    tags: Optional[List[str]] = None
+    tags: Optional[Tuple[str, ...]] = None
+    # Render hints written by format_code_blocks.py, kept as they are
+    render: Optional[str] = None
+    # Stable id derived from the content (see TestDeduplicator.content_id)
+    uid: Optional[str] = None
+    # Normalized forms used to compare questions, computed once when the question is created
+    normalized_question: str = field(init=False, repr=False, compare=False)
+    normalized_options: Tuple[str, ...] = field(init=False, repr=False, compare=False)
+    option_set: FrozenSet[str] = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        normalize = TestDeduplicator.normalize_text
+        normalized_options = tuple(map(normalize, self.options))
+        object.__setattr__(self, 'normalized_question', normalize(self.question))
+        object.__setattr__(self, 'normalized_options', normalized_options)
+        object.__setattr__(self, 'option_set', frozenset(normalized_options))
     
     def to_dict(self) -> Dict[str, Any]:
         result = {
             "id": self.id,
+        }
+        if self.uid is not None:
+            result["uid"] = self.uid
+        result.update({
             "question": self.question,
-            "options": self.options,
+            "options": list(self.options),
             "correctAnswer": self.correctAnswer,
-        }
+        })
         if self.image:
             result["image"] = self.image
         if self.tags:
-            result["tags"] = self.tags
+            result["tags"] = list(self.tags)
+        if self.render is not None:
+            result["render"] = self.render
         return result
 
 class TestParser:
@@ -40,13 +87,17 @@ class TestParser:
         for item in data:
             # Handle potential variations in field names if necessary, 
             # but strictly following the current schema:
+            tags = item.get("tags")
             q = Question(
                 id=item.get("id", 0),
                 question=item.get("question", ""),
-                options=item.get("options", []),
+                options=tuple(item.get("options", ())),
                 correctAnswer=item.get("correctAnswer", -1),
                 image=item.get("image"),
-                tags=item.get("tags")
+                # Interning only saves memory; odd tags pass through as they always have
+                tags=tuple(sys.intern(tag) if isinstance(tag, str) else tag for tag in tags) if tags is not None else None,
+                render=item.get("render"),
+                uid=item.get("uid")
             )
             questions.append(q)
         
@@ -56,11 +107,17 @@ class TestDeduplicator:
     """Remove duplicate questions from test files"""
     
     @staticmethod
+    @lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
     def normalize_text(text: str) -> str:
-        """Normalize text for comparison (remove extra whitespace, etc.)"""
-        # Remove extra whitespace, normalize line breaks
-        normalized = re.sub(r'\s+', ' ', text.strip())
-        return normalized.lower()
+        """
+        Normalize text for comparison: collapse whitespace, then NFKC and casefold so
+        composed and decomposed accents (or ligatures, full-width forms) compare equal.
+        Memoized, since the same strings come up again and again in a run.
+        """
+        # Remove extra whitespace, normalize line breaks (split() knows the same
+        # Unicode whitespace as \s and is much faster than a regex substitution)
+        normalized = ' '.join(text.split())
+        return unicodedata.normalize('NFKC', normalized).casefold()
     
     @staticmethod
     def questions_are_duplicate(q1: Question, q2: Question) -> bool:
@@ -69,15 +126,8 @@ class TestDeduplicator:
         Questions are duplicates if they have the same question text and the same set of options
         (regardless of order).
         """
-        # Compare normalized question texts
-        if TestDeduplicator.normalize_text(q1.question) != TestDeduplicator.normalize_text(q2.question):
-            return False
-        
-        # Compare option sets (order doesn't matter)
-        options1_normalized = {TestDeduplicator.normalize_text(opt) for opt in q1.options}
-        options2_normalized = {TestDeduplicator.normalize_text(opt) for opt in q2.options}
-        
-        return options1_normalized == options2_normalized
+        # Compare normalized question texts, then option sets (order doesn't matter)
+        return q1.normalized_question == q2.normalized_question and q1.option_set == q2.option_set
     
     @staticmethod
     def standardize_option_order(canonical_question: Question, duplicate_question: Question) -> Question:
@@ -85,39 +135,32 @@ class TestDeduplicator:
         Reorder the options of duplicate_question to match the order in canonical_question.
         Also updates the correctAnswer accordingly.
         """
-        # Create mapping from normalized option text to original option text for both questions
-        canonical_options_normalized = [TestDeduplicator.normalize_text(opt) for opt in canonical_question.options]
-        duplicate_options_normalized = [TestDeduplicator.normalize_text(opt) for opt in duplicate_question.options]
+        # Map each normalized option of the duplicate to its first position
+        duplicate_positions: Dict[str, int] = {}
+        for j, duplicate_opt_norm in enumerate(duplicate_question.normalized_options):
+            duplicate_positions.setdefault(duplicate_opt_norm, j)
         
         # Create reordered options list matching canonical order
         reordered_options = []
         new_correct_answer_index = -1
         
         # For each option in canonical order, find the corresponding option in duplicate
-        for i, canonical_opt_norm in enumerate(canonical_options_normalized):
-            # Find this option in the duplicate question
-            for j, duplicate_opt_norm in enumerate(duplicate_options_normalized):
-                if canonical_opt_norm == duplicate_opt_norm:
-                    reordered_options.append(duplicate_question.options[j])
-                    # If this was the correct answer in the duplicate, update the index
-                    if j == duplicate_question.correctAnswer:
-                        new_correct_answer_index = i
-                    break
+        for i, canonical_opt_norm in enumerate(canonical_question.normalized_options):
+            j = duplicate_positions.get(canonical_opt_norm)
+            if j is not None:
+                reordered_options.append(duplicate_question.options[j])
+                # If this was the correct answer in the duplicate, update the index
+                if j == duplicate_question.correctAnswer:
+                    new_correct_answer_index = i
         
         # Create new question with reordered options
-        return Question(
-            id=duplicate_question.id,
-            question=duplicate_question.question,
-            options=reordered_options,
-            correctAnswer=new_correct_answer_index,
-            image=duplicate_question.image,
-            tags=duplicate_question.tags
-        )
+        return replace(duplicate_question, options=tuple(reordered_options), correctAnswer=new_correct_answer_index)
     
     @staticmethod
-    def merge_tags(tags1: Optional[List[str]], tags2: Optional[List[str]]) -> Optional[List[str]]:
+    def merge_tags(tags1: Optional[Tuple[str, ...]], tags2: Optional[Tuple[str, ...]]) -> Optional[Tuple[str, ...]]:
         """
-        Merge two lists of tags, removing duplicates and maintaining order.
+        Merge two tuples of tags, removing duplicates and maintaining order.
+        When the result equals one of the inputs, that input is returned rather than a copy.
         """
         if not tags1 and not tags2:
             return None
@@ -131,12 +174,67 @@ class TestDeduplicator:
         seen = set()
         
         for tag in tags1 + tags2:
-            normalized_tag = tag.lower().strip()
+            normalized_tag = TestDeduplicator.normalize_text(tag)
             if normalized_tag not in seen:
-                merged.append(tag.strip())
+                merged.append(sys.intern(tag.strip()))
                 seen.add(normalized_tag)
         
-        return merged
+        merged = tuple(merged)
+        return tags1 if merged == tags1 else merged
+    
+    @staticmethod
+    def question_key(question: Question) -> Tuple[str, FrozenSet[str]]:
+        """
+        Build the hash key used to group duplicates: the normalized question text and
+        the set of normalized options. Two questions share a key exactly when
+        questions_are_duplicate() considers them duplicates.
+        """
+        return question.normalized_question, question.option_set
+    
+    @staticmethod
+    def content_id(question: Question) -> str:
+        """
+        Stable id of a question: a hash of its question_key. Unlike the positional
+        `id`, it survives edits elsewhere in the file, renumbering and merging, and
+        only changes when the question or its set of options changes.
+        """
+        normalized_question, option_set = TestDeduplicator.question_key(question)
+        key = '\0'.join([normalized_question, *sorted(option_set)])
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()[:CONTENT_ID_LENGTH]
+    
+    @staticmethod
+    def assign_content_ids(questions: List[Question]) -> Tuple[List[Question], int]:
+        """
+        Give every question its content id.
+        Returns (questions, number of ids that were missing or out of date).
+        """
+        result = []
+        changed = 0
+        for question in questions:
+            uid = TestDeduplicator.content_id(question)
+            if question.uid != uid:
+                question = replace(question, uid=uid)
+                changed += 1
+            result.append(question)
+        return result, changed
+    
+    @staticmethod
+    def group_duplicates(questions: List[Question]) -> Dict[int, List[int]]:
+        """
+        Group duplicate questions in a single pass over a hash index.
+        Returns a mapping from the leader index (first occurrence) to the indices of its
+        duplicates in ascending order. Questions without duplicates are not included.
+        """
+        index: Dict[Tuple[str, FrozenSet[str]], int] = {}
+        groups: Dict[int, List[int]] = {}
+        
+        for i, question in enumerate(questions):
+            key = TestDeduplicator.question_key(question)
+            leader = index.setdefault(key, i)
+            if leader != i:
+                groups.setdefault(leader, []).append(i)
+        
+        return groups
     
     @staticmethod
     def find_duplicates(questions: List[Question]) -> List[Tuple[int, int]]:
@@ -146,11 +244,13 @@ class TestDeduplicator:
         """
         duplicates = []
         
-        for i in range(len(questions)):
-            for j in range(i + 1, len(questions)):
-                if TestDeduplicator.questions_are_duplicate(questions[i], questions[j]):
-                    duplicates.append((i, j))
+        for leader, members in TestDeduplicator.group_duplicates(questions).items():
+            group = [leader] + members
+            for a in range(len(group)):
+                for b in range(a + 1, len(group)):
+                    duplicates.append((group[a], group[b]))
         
+        duplicates.sort()
         return duplicates
     
     @staticmethod
@@ -163,97 +263,269 @@ class TestDeduplicator:
         if not questions:
             return [], 0
         
-        # Find all duplicate pairs
-        duplicate_pairs = TestDeduplicator.find_duplicates(questions)
+        duplicate_groups = TestDeduplicator.group_duplicates(questions)
         
-        if not duplicate_pairs:
+        if not duplicate_groups:
             return questions, 0
         
-        # Create a mapping of which questions are duplicates of which
-        duplicate_groups = {}
+        # Merge tags for each group, leader first and then duplicates in file order
+        tags_merges = {}
         indices_to_remove = set()
         
-        for first_idx, second_idx in duplicate_pairs:
-            # Find the group leader (lowest index in the group)
-            if first_idx in duplicate_groups:
-                leader = duplicate_groups[first_idx]
-            else:
-                leader = first_idx
-                duplicate_groups[first_idx] = first_idx
-            
-            # Add the second question to the same group
-            duplicate_groups[second_idx] = leader
-            indices_to_remove.add(second_idx)
-        
-        # Merge tags for each group and standardize option orders
-        tags_merges = {}
-        standardized_questions = {}
+        for leader, members in duplicate_groups.items():
+            merged_tags = questions[leader].tags
+            for idx in members:
+                merged_tags = TestDeduplicator.merge_tags(merged_tags, questions[idx].tags)
+                indices_to_remove.add(idx)
+            tags_merges[leader] = merged_tags
         
-        for idx, leader in duplicate_groups.items():
-            if leader not in tags_merges:
-                tags_merges[leader] = questions[leader].tags
-                # The leader question is the canonical version for option ordering
-                standardized_questions[leader] = questions[leader]
-            
-            if idx != leader:
-                # Merge tags
-                tags_merges[leader] = TestDeduplicator.merge_tags(
-                    tags_merges[leader], 
-                    questions[idx].tags
-                )
-                
-                # Standardize the duplicate's option order to match the leader
-                # (This part might be redundant if we are removing the duplicate key,
-                # but good for consistency if we ever kept duplicates)
-                
         # Create the result list
         unique_questions = []
         for i, question in enumerate(questions):
             if i not in indices_to_remove:
                 # If this question had duplicates, use the merged tags
-                if i in tags_merges:
-                    # Create a new question with merged tags
-                    merged_question = Question(
-                        id=question.id,
-                        question=question.question,
-                        options=question.options,
-                        correctAnswer=question.correctAnswer,
-                        image=question.image,
-                        tags=tags_merges[i]
-                    )
-                    unique_questions.append(merged_question)
+                if i in tags_merges and tags_merges[i] is not question.tags:
+                    # Copy of the question with the merged tags; every other field is shared
+                    unique_questions.append(replace(question, tags=tags_merges[i]))
                 else:
                     unique_questions.append(question)
         
         num_removed = len(indices_to_remove)
         return unique_questions, num_removed
 
-def process_file(file_path: Path) -> Tuple[int, int]:
+profiling.instrument(TestDeduplicator, 'normalize_text', 'normalize')
+profiling.instrument(TestDeduplicator, 'group_duplicates', 'compare')
+
+@dataclass
+class NearDuplicatePair:
+    """A pair of questions that look like rewordings of each other"""
+    file: str
+    first_id: int
+    second_id: int
+    score: float
+    first_question: str
+    second_question: str
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+class NearDuplicateDetector:
+    """
+    Find reworded questions with MinHash signatures and locality-sensitive hashing.
+    Each question (text plus options) is turned into a set of character shingles,
+    signatures are bucketed band by band, and only questions sharing a bucket are
+    compared with their exact Jaccard similarity.
+    """
+    
+    SHINGLE_SIZE = 5
+    _PRIME = (1 << 61) - 1
+    
+    def __init__(self, threshold: float = 0.8, num_permutations: int = 64, bands: int = 16, seed: int = 1):
+        if num_permutations % bands != 0:
+            raise ValueError("num_permutations must be a multiple of bands")
+        self.threshold = threshold
+        self.num_permutations = num_permutations
+        self.bands = bands
+        self.rows = num_permutations // bands
+        rng = random.Random(seed)
+        self.hash_a = rng.randrange(1, self._PRIME)
+        self.hash_b = rng.randrange(0, self._PRIME)
+    
+    @staticmethod
+    def shingles(question: Question) -> Set[int]:
+        """
+        Hash the character shingles of a question and its options.
+        All whitespace is dropped so spacing changes (e.g. inside LaTeX) do not count,
+        and options are sorted so their order does not matter either.
+        """
+        options = sorted(question.normalized_options)
+        text = '\x1f'.join([question.normalized_question] + options)
+        compact = ''.join(text.split())
+        
+        size = NearDuplicateDetector.SHINGLE_SIZE
+        if len(compact) <= size:
+            return {zlib.crc32(compact.encode('utf-8'))}
+        return {zlib.crc32(compact[i:i + size].encode('utf-8')) for i in range(len(compact) - size + 1)}
+    
+    def signature(self, shingles: Set[int]) -> List[int]:
+        """
+        Compute the MinHash signature of a shingle set.
+        Uses one-permutation hashing: every shingle is hashed once and lands in one of
+        num_permutations bins, keeping the minimum per bin. Empty bins borrow the value
+        of the next non-empty bin (rotation densification) so short texts still get a
+        full signature.
+        """
+        prime = self._PRIME
+        a, b = self.hash_a, self.hash_b
+        bins = self.num_permutations
+        slots: List[Optional[int]] = [None] * bins
+        
+        for shingle in shingles:
+            h = (a * shingle + b) % prime
+            index, value = h % bins, h // bins
+            current = slots[index]
+            if current is None or value < current:
+                slots[index] = value
+        
+        if None not in slots:
+            return slots
+        
+        signature = list(slots)
+        for i in range(bins):
+            if slots[i] is None:
+                for offset in range(1, bins):
+                    borrowed = slots[(i + offset) % bins]
+                    if borrowed is not None:
+                        signature[i] = borrowed + offset * prime
+                        break
+        return signature
+    
+    @staticmethod
+    def jaccard(first: Set[int], second: Set[int]) -> float:
+        """Jaccard similarity of two shingle sets"""
+        if not first and not second:
+            return 1.0
+        return len(first & second) / len(first | second)
+    
+    def candidate_pairs(self, signatures: List[List[int]]) -> Set[Tuple[int, int]]:
+        """Return index pairs that share at least one LSH bucket"""
+        candidates = set()
+        
+        for band in range(self.bands):
+            start = band * self.rows
+            buckets: Dict[Tuple[int, ...], List[int]] = {}
+            for i, signature in enumerate(signatures):
+                buckets.setdefault(tuple(signature[start:start + self.rows]), []).append(i)
+            
+            for members in buckets.values():
+                for a in range(len(members)):
+                    for b in range(a + 1, len(members)):
+                        candidates.add((members[a], members[b]))
+        
+        return candidates
+    
+    def find_near_duplicates(self, questions: List[Question]) -> List[Tuple[int, int, float]]:
+        """
+        Find pairs of questions whose similarity reaches the threshold but which are
+        not exact duplicates (those are already merged by remove_duplicates).
+        Returns (index1, index2, score) tuples sorted by descending score.
+        """
+        shingle_sets = [self.shingles(q) for q in questions]
+        signatures = [self.signature(shingles) for shingles in shingle_sets]
+        keys = [TestDeduplicator.question_key(q) for q in questions]
+        
+        pairs = []
+        with profiling.span('compare'):
+            for i, j in self.candidate_pairs(signatures):
+                if keys[i] == keys[j]:
+                    continue
+                score = self.jaccard(shingle_sets[i], shingle_sets[j])
+                if score >= self.threshold:
+                    pairs.append((i, j, score))
+        
+        pairs.sort(key=lambda pair: (-pair[2], pair[0], pair[1]))
+        return pairs
+
+class GlobalDuplicateIndex:
+    """
+    Shared hash index of questions across several files.
+    Files are added one at a time, so every file only needs to be read once.
+    """
+    
+    def __init__(self):
+        self.entries: Dict[Tuple[str, FrozenSet[str]], List[Tuple[str, int]]] = {}
+        self.questions: Dict[str, List[Question]] = {}
+    
+    def add_file(self, file_name: str, questions: List[Question]) -> None:
+        """Register the (already deduplicated) questions of a file"""
+        self.questions[file_name] = questions
+        for i, question in enumerate(questions):
+            self.entries.setdefault(TestDeduplicator.question_key(question), []).append((file_name, i))
+    
+    def cross_file_groups(self) -> List[List[Tuple[str, int]]]:
+        """
+        Return the groups of questions that appear in more than one file,
+        as (file_name, index) locations in the order the files were added.
+        """
+        return [
+            locations for locations in self.entries.values()
+            if len({file_name for file_name, _ in locations}) > 1
+        ]
+    
+    def tag_union(self, locations: List[Tuple[str, int]]) -> Optional[List[str]]:
+        """Merge the tags of every copy of a question, in file order"""
+        merged_tags = None
+        for file_name, i in locations:
+            merged_tags = TestDeduplicator.merge_tags(merged_tags, self.questions[file_name][i].tags)
+        return merged_tags
+    
+    def merge_cross_file_tags(self) -> Set[str]:
+        """
+        Give every copy of a cross-file duplicate the union of all their tags.
+        Returns the names of the files whose questions changed.
+        """
+        changed_files = set()
+        
+        for locations in self.cross_file_groups():
+            merged_tags = self.tag_union(locations)
+            for file_name, i in locations:
+                question = self.questions[file_name][i]
+                if (question.tags or None) != merged_tags:
+                    self.questions[file_name][i] = replace(question, tags=merged_tags)
+                    changed_files.add(file_name)
+        
+        return changed_files
+    
+    def also_appears_in(self) -> Dict[str, Dict[str, List[str]]]:
+        """
+        Build the per-file "also appears in" map for the front end:
+        {test_id: {question_id: [other test_ids]}}.
+        """
+        also_in: Dict[str, Dict[str, List[str]]] = {}
+        
+        for locations in self.cross_file_groups():
+            test_ids = sorted({Path(file_name).stem for file_name, _ in locations})
+            for file_name, i in locations:
+                test_id = Path(file_name).stem
+                others = [other for other in test_ids if other != test_id]
+                question_id = str(self.questions[file_name][i].id)
+                also_in.setdefault(test_id, {})[question_id] = others
+        
+        return {test_id: also_in[test_id] for test_id in sorted(also_in)}
+
+def process_file(file_path: Path, compact: bool = False) -> Optional[Tuple[int, int, int]]:
     """
     Process a single JSON file to remove duplicates.
-    Returns (original_count, final_count).
+    With `compact`, the file is (re)written in the compact output profile.
+    Returns (original_count, final_count, bytes_saved), or None if the file could not be processed.
     """
     try:
         # Read the file
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        with profiling.span('read'):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                raw = f.read()
+        with profiling.span('decode'):
+            data = json.loads(raw)
         
         if not isinstance(data, list):
             print(f"  ❌ Error: {file_path.name} is not a list of questions.")
-            return 0, 0
+            return None
 
         # Parse questions
         questions = TestParser.parse_json(data)
         original_count = len(questions)
         
         if original_count == 0:
-            return 0, 0
+            return 0, 0, 0
         
         # Remove duplicates and merge tags
         unique_questions, num_removed = TestDeduplicator.remove_duplicates(questions)
+        unique_questions, ids_assigned = TestDeduplicator.assign_content_ids(unique_questions)
         final_count = len(unique_questions)
         
-        if num_removed > 0:
+        bytes_saved = 0
+        
+        if num_removed > 0 or ids_assigned > 0 or compact:
             # Reconstruct and write the file
             # Re-index questions to ensure sequential IDs if necessary?
             # The user didn't explicitly ask for re-indexing, but it might be good practice.
@@ -261,26 +533,124 @@ def process_file(file_path: Path) -> Tuple[int, int]:
             # The original script didn't seem to care about IDs (it was text based).
             # Let's just write them back.
             
-            output_data = [q.to_dict() for q in unique_questions]
-            
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(output_data, f, indent=2, ensure_ascii=False)
+            with profiling.span('encode'):
+                output_data = [q.to_dict() for q in unique_questions]
+                output = encode_questions(output_data, compact)
             
+            with profiling.span('write'):
+                if write_if_changed(file_path, output):
+                    bytes_saved = len(raw.encode('utf-8')) - len(output.encode('utf-8'))
+        
+        if num_removed > 0:
             print(f"  ✅ Merged {num_removed} duplicate(s): {original_count} → {final_count}")
         else:
             print(f"  ⚪ No duplicates found ({original_count} questions)")
+        if ids_assigned > 0:
+            print(f"  🔑 Assigned {ids_assigned} content id(s)")
+        if compact:
+            print(f"  📦 Compact output: {format_bytes_saved(len(raw.encode('utf-8')), len(output.encode('utf-8')))}")
+        
+        return original_count, final_count, bytes_saved
+        
+    except json.JSONDecodeError as e:
+        print(f"  ❌ Error decoding JSON in {file_path.name}: {e}")
+        return None
+    except Exception as e:
+        print(f"  ❌ Error processing {file_path.name}: {e}")
+        return None
+
+def report_near_duplicates(file_path: Path, detector: NearDuplicateDetector) -> List[NearDuplicatePair]:
+    """
+    Find reworded questions in a single JSON file without modifying it.
+    Returns the pairs found for the review report.
+    """
+    try:
+        with profiling.span('read'):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                raw = f.read()
+        with profiling.span('decode'):
+            data = json.loads(raw)
         
-        return original_count, final_count
+        if not isinstance(data, list):
+            print(f"  ❌ Error: {file_path.name} is not a list of questions.")
+            return []
+        
+        questions = TestParser.parse_json(data)
+        pairs = [
+            NearDuplicatePair(
+                file=file_path.name,
+                first_id=questions[i].id,
+                second_id=questions[j].id,
+                score=round(score, 3),
+                first_question=questions[i].question,
+                second_question=questions[j].question
+            )
+            for i, j, score in detector.find_near_duplicates(questions)
+        ]
+        
+        if pairs:
+            print(f"  🔍 Found {len(pairs)} near-duplicate pair(s) to review")
+            for pair in pairs:
+                print(f"     #{pair.first_id} ~ #{pair.second_id} (score {pair.score:.3f})")
+        else:
+            print(f"  ⚪ No near-duplicates found ({len(questions)} questions)")
+        
+        return pairs
         
     except json.JSONDecodeError as e:
         print(f"  ❌ Error decoding JSON in {file_path.name}: {e}")
-        return 0, 0
+        return []
     except Exception as e:
         print(f"  ❌ Error processing {file_path.name}: {e}")
-        return 0, 0
+        return []
+
+def process_directory_fuzzy(input_dir: Path, threshold: float, report_path: Optional[Path] = None,
+                            jobs: int = 1) -> None:
+    """Report near-duplicate questions in every JSON file of a directory"""
+    
+    if not input_dir.exists():
+        print(f"Error: Directory '{input_dir}' not found.")
+        return
+    
+    if not input_dir.is_dir():
+        print(f"Error: '{input_dir}' is not a directory.")
+        return
+    
+    files = list_data_files(input_dir)
+    
+    if not files:
+        print(f"No JSON files found in '{input_dir}'")
+        return
+    
+    print(f"Found {len(files)} JSON files in '{input_dir}'")
+    
+    detector = NearDuplicateDetector(threshold=threshold)
+    all_pairs: List[NearDuplicatePair] = []
+    
+    scan = partial(report_near_duplicates, detector=detector)
+    for file_path, pairs in map_files(scan, files, jobs, header="Scanning"):
+        all_pairs.extend(pairs)
+    
+    if report_path:
+        write_if_changed(report_path, json.dumps([pair.to_dict() for pair in all_pairs], indent=2, ensure_ascii=False))
+    
+    print(f"\n{'='*50}")
+    print(f"SUMMARY:")
+    print(f"Files scanned: {len(files)}")
+    print(f"Near-duplicate pairs (score ≥ {threshold}): {len(all_pairs)}")
+    if report_path:
+        print(f"Review report written to: {report_path}")
+    print(f"{'='*50}")
 
-def process_directory(input_dir: Path) -> None:
-    """Process all JSON files in a directory to remove duplicates"""
+def process_directory(input_dir: Path, jobs: int = 1, force: bool = False, compact: bool = False,
+                      corpus_db: Optional[Path] = None) -> None:
+    """
+    Process all JSON files in a directory to remove duplicates.
+    Files left unchanged since the last run (according to the manifest) are skipped
+    unless `force` is set. With `compact`, files are written in the compact output profile.
+    With `corpus_db`, files the SQLite corpus cache shows to have neither duplicates
+    nor stale content ids are not decoded at all.
+    """
     
     if not input_dir.exists():
         print(f"Error: Directory '{input_dir}' not found.")
@@ -291,7 +661,7 @@ def process_directory(input_dir: Path) -> None:
         return
     
     # Get all JSON files in the directory
-    files = [f for f in input_dir.iterdir() if f.is_file() and f.suffix == '.json']
+    files = list_data_files(input_dir)
     
     if not files:
         print(f"No JSON files found in '{input_dir}'")
@@ -299,39 +669,268 @@ def process_directory(input_dir: Path) -> None:
     
     print(f"Found {len(files)} JSON files in '{input_dir}'")
     
+    manifest = Manifest(input_dir, "deduplicator", TOOL_VERSION + ("+compact" if compact else ""))
+    pending = files if force else [f for f in files if not manifest.is_unchanged(f)]
+    skipped_files = len(files) - len(pending)
+    if skipped_files:
+        print(f"Skipping {skipped_files} unchanged file(s) (use --force to reprocess them)")
+    
     total_original = 0
     total_final = 0
     processed_files = 0
+    bytes_saved: Dict[str, int] = {}
+    
+    clean_files = []
+    if corpus_db is not None and not compact:
+        with open_corpus(input_dir, corpus_db) as corpus:
+            duplicated = set(corpus.files_needing_dedupe())
+            counts = corpus.question_counts()
+        clean_files = [f for f in pending if f.name not in duplicated and f.name in counts]
+        pending = [f for f in pending if f not in clean_files]
+        if clean_files:
+            print(f"Skipping {len(clean_files)} file(s) the corpus cache shows need no changes")
+        for file_path in clean_files:
+            manifest.record(file_path)
+            total_original += counts[file_path.name][0]
+            total_final += counts[file_path.name][0]
+            processed_files += counts[file_path.name][0] > 0
     
-    for file_path in files:
-        print(f"\nProcessing: {file_path.name}")
-        original_count, final_count = process_file(file_path)
+    for file_path, result in map_files(partial(process_file, compact=compact), pending, jobs):
+        if result is None:
+            continue
         
+        manifest.record(file_path)
+        original_count, final_count, saved = result
+        if compact:
+            bytes_saved[file_path.name] = saved
         if original_count > 0:
             total_original += original_count
             total_final += final_count
             processed_files += 1
     
+    manifest.prune(files)
+    manifest.save()
+    
     total_removed = total_original - total_final
     
     print(f"\n{'='*50}")
     print(f"SUMMARY:")
     print(f"Files processed: {processed_files}/{len(files)}")
+    if skipped_files:
+        print(f"Files skipped (unchanged): {skipped_files}")
+    if clean_files:
+        print(f"Files needing no changes (corpus cache): {len(clean_files)}")
     print(f"Total questions: {total_original} → {total_final}")
     print(f"Total duplicates merged: {total_removed}")
     if total_original > 0:
         percentage = (total_removed / total_original) * 100
         print(f"Reduction: {percentage:.1f}%")
+    if compact:
+        print(f"Bytes saved by compact output:")
+        for file_name, saved in bytes_saved.items():
+            print(f"  {file_name}: {saved:,}")
+        print(f"  Total: {sum(bytes_saved.values()):,}")
+    print(f"{'='*50}")
+
+def open_corpus(input_dir: Path, db_path: Path):
+    """Open the SQLite corpus cache and bring it up to date with the files of input_dir"""
+    # Imported here because the corpus module builds on this one
+    from corpus import Corpus
+    
+    corpus = Corpus(db_path)
+    reloaded, removed = corpus.refresh(input_dir)
+    print(f"Corpus cache: {reloaded} file(s) reloaded, {removed} removed")
+    return corpus
+
+def load_and_deduplicate(file_path: Path) -> Optional[Tuple[int, List[Question], int]]:
+    """
+    Read a JSON file, remove its duplicates and assign content ids without writing it back.
+    Returns (original_count, unique_questions, ids_assigned), or None if the file could not be read.
+    """
+    try:
+        with profiling.span('read'):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                raw = f.read()
+        with profiling.span('decode'):
+            data = json.loads(raw)
+        
+        if not isinstance(data, list):
+            print(f"  ❌ Error: {file_path.name} is not a list of questions.")
+            return None
+        
+        questions = TestParser.parse_json(data)
+        unique_questions, num_removed = TestDeduplicator.remove_duplicates(questions)
+        unique_questions, ids_assigned = TestDeduplicator.assign_content_ids(unique_questions)
+        
+    except json.JSONDecodeError as e:
+        print(f"  ❌ Error decoding JSON in {file_path.name}: {e}")
+        return None
+    except Exception as e:
+        print(f"  ❌ Error processing {file_path.name}: {e}")
+        return None
+    
+    if num_removed > 0:
+        print(f"  ✅ Merged {num_removed} duplicate(s): {len(questions)} → {len(unique_questions)}")
+    else:
+        print(f"  ⚪ No duplicates found ({len(questions)} questions)")
+    if ids_assigned > 0:
+        print(f"  🔑 Assigned {ids_assigned} content id(s)")
+    
+    return len(questions), unique_questions, ids_assigned
+
+def process_directory_global(input_dir: Path, merge_tags: bool = False, also_in_path: Optional[Path] = None,
+                             jobs: int = 1, compact: bool = False, corpus_db: Optional[Path] = None) -> None:
+    """
+    Remove duplicates in every JSON file of a directory and detect questions shared
+    between files through one index built over all of them.
+    With `corpus_db` (and without `merge_tags`, which needs every question), the
+    shared questions are found by querying the SQLite corpus cache and only the
+    files with duplicates of their own or stale content ids are decoded.
+    """
+    
+    if not input_dir.exists():
+        print(f"Error: Directory '{input_dir}' not found.")
+        return
+    
+    if not input_dir.is_dir():
+        print(f"Error: '{input_dir}' is not a directory.")
+        return
+    
+    files = list_data_files(input_dir)
+    
+    if not files:
+        print(f"No JSON files found in '{input_dir}'")
+        return
+    
+    print(f"Found {len(files)} JSON files in '{input_dir}'")
+    
+    corpus = None
+    if corpus_db is not None and merge_tags:
+        print("--merge-tags needs every question: decoding all files instead of using the corpus cache")
+    elif corpus_db is not None:
+        corpus = open_corpus(input_dir, corpus_db)
+    
+    to_load = files
+    if corpus is not None:
+        duplicated = set(corpus.files_needing_dedupe())
+        to_load = [f for f in files if f.name in duplicated]
+        print(f"Decoding {len(to_load)} file(s) with duplicates or stale content ids, the corpus cache covers the others")
+    
+    index = GlobalDuplicateIndex()
+    changed_files = set()
+    total_original = 0
+    total_final = 0
+    
+    for file_path, result in map_files(load_and_deduplicate, to_load, jobs):
+        if result is None:
+            continue
+        
+        original_count, unique_questions, ids_assigned = result
+        if len(unique_questions) < original_count or ids_assigned > 0:
+            changed_files.add(file_path.name)
+        
+        total_original += original_count
+        total_final += len(unique_questions)
+        index.add_file(file_path.name, unique_questions)
+    
+    if corpus is not None:
+        counts = corpus.question_counts()
+        processed_files = len(counts)
+        total_original = sum(total for total, _ in counts.values())
+        total_final = sum(unique for _, unique in counts.values())
+        groups = corpus.cross_file_groups()
+        also_in = corpus.also_appears_in() if also_in_path else None
+        corpus.close()
+    else:
+        processed_files = len(index.questions)
+        groups = index.cross_file_groups()
+        also_in = index.also_appears_in() if also_in_path else None
+    
+    pair_counts: Dict[Tuple[str, ...], int] = {}
+    for locations in groups:
+        file_names = tuple(sorted({file_name for file_name, _ in locations}))
+        pair_counts[file_names] = pair_counts.get(file_names, 0) + 1
+    
+    print(f"\nCross-file duplicates:")
+    if pair_counts:
+        for file_names, count in sorted(pair_counts.items()):
+            print(f"  🔗 {count} question(s) shared by {', '.join(file_names)}")
+    else:
+        print(f"  ⚪ No questions shared between files")
+    
+    if merge_tags:
+        tag_changes = index.merge_cross_file_tags()
+        for file_name in sorted(tag_changes):
+            print(f"  🏷️  Merged tags of shared questions in {file_name}")
+        changed_files |= tag_changes
+    
+    written_files = 0
+    for file_name in sorted(changed_files):
+        with profiling.span('encode'):
+            output = encode_questions([q.to_dict() for q in index.questions[file_name]], compact)
+        with profiling.span('write'):
+            written_files += write_if_changed(input_dir / file_name, output)
+    
+    if also_in_path:
+        write_if_changed(also_in_path, json.dumps(also_in, indent=2, ensure_ascii=False))
+    
+    total_removed = total_original - total_final
+    
+    print(f"\n{'='*50}")
+    print(f"SUMMARY:")
+    print(f"Files processed: {processed_files}/{len(files)}")
+    print(f"Total questions: {total_original} → {total_final}")
+    print(f"Total duplicates merged: {total_removed}")
+    print(f"Questions shared between files: {len(groups)}")
+    print(f"Files written: {written_files}")
+    if also_in_path:
+        print(f"\"Also appears in\" map written to: {also_in_path}")
     print(f"{'='*50}")
 
 def main():
     """Main function to process ../src/data directory"""
+    parser = argparse.ArgumentParser(description="Merge duplicate questions in the test data files")
+    parser.add_argument('--fuzzy', action='store_true',
+                        help="report reworded near-duplicates for review instead of merging exact duplicates")
+    parser.add_argument('--threshold', type=float, default=0.8,
+                        help="minimum similarity for --fuzzy pairs (default: 0.8)")
+    parser.add_argument('--report', type=Path,
+                        help="write the --fuzzy review report as JSON to this path")
+    parser.add_argument('--global', dest='global_index', action='store_true',
+                        help="also detect questions shared between files using one index over all of them")
+    parser.add_argument('--merge-tags', action='store_true',
+                        help="with --global, give every copy of a shared question the union of their tags")
+    parser.add_argument('--also-in', type=Path,
+                        help="with --global, write the per-file \"also appears in\" map as JSON to this path")
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="number of files to process in parallel (0 = one per CPU, default: 1)")
+    parser.add_argument('--force', action='store_true',
+                        help="reprocess every file, even those unchanged since the last run")
+    parser.add_argument('--compact', action='store_true',
+                        help="write minified JSON without empty optional fields")
+    parser.add_argument('--corpus', action='store_true',
+                        help="use the SQLite corpus cache (tools/.cache/corpus.sqlite3) to avoid decoding "
+                             "files that need no changes")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    
     script_dir = Path(__file__).parent.absolute()
     data_dir = script_dir / ".." / "src" / "data"
+    corpus_db = script_dir / ".cache" / "corpus.sqlite3" if args.corpus else None
     
-    print(f"Processing all test files in: {data_dir.resolve()}")
-    print("Merging duplicate questions and combining tags...")
-    process_directory(data_dir)
+    with profiling.session(args):
+        if args.fuzzy:
+            print(f"Scanning all test files in: {data_dir.resolve()}")
+            print("Looking for reworded near-duplicate questions (no files are modified)...")
+            process_directory_fuzzy(data_dir, args.threshold, args.report, args.jobs)
+            return
+        
+        print(f"Processing all test files in: {data_dir.resolve()}")
+        print("Merging duplicate questions and combining tags...")
+        if args.global_index:
+            process_directory_global(data_dir, args.merge_tags, args.also_in, args.jobs, args.compact, corpus_db)
+        else:
+            process_directory(data_dir, args.jobs, args.force, args.compact, corpus_db)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
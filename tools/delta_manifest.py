@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+
+import argparse
+import hashlib
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from deduplicator import TestDeduplicator, TestParser
+from manifest import list_data_files
+from output import compact_question, write_if_changed
+
+SNAPSHOT_FORMAT = 1
+
+SNAPSHOT_NAME = 'snapshot.json'
+LATEST_NAME = 'latest.json'
+
+# Number of releases a client can be behind and still catch up through deltas
+DEFAULT_KEEP = 20
+
+# Length of the per-question fingerprints
+FINGERPRINT_LENGTH = 12
+
+# Snapshot of one file: uid -> fingerprint of everything a client shows
+FileSnapshot = Dict[str, str]
+
+def fingerprint(question: Dict[str, Any]) -> str:
+    """
+    Hash of a question's non-empty fields except its ids: the positional `id` shifts
+    whenever a question is inserted or merged above it, and the uid is the key itself
+    """
+    fields = {key: value for key, value in compact_question(question).items() if key not in ('id', 'uid')}
+    encoded = json.dumps(fields, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()[:FINGERPRINT_LENGTH]
+
+def keyed_questions(data: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    uid -> question (with its uid set) for one file. Questions without a uid get
+    their content id computed here, so files the deduplicator has not updated
+    yet still diff correctly. Of exact duplicates, the first one is kept, as
+    the deduplicator does.
+    """
+    questions = {}
+    for item, question in zip(data, TestParser.parse_json(data)):
+        uid = question.uid or TestDeduplicator.content_id(question)
+        questions.setdefault(uid, {**item, 'uid': uid})
+    return questions
+
+def snapshot_hash(snapshot: FileSnapshot) -> str:
+    """Hash of a file snapshot, for clients to check that their copy is up to date"""
+    encoded = json.dumps(snapshot, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()[:FINGERPRINT_LENGTH]
+
+def diff_file(previous: FileSnapshot, current: Dict[str, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Delta of one file between two releases: the questions added and changed (in
+    full) and the uids removed. Returns None if nothing changed.
+    Editing a question's text or options gives it a new uid, so it shows up as
+    removed and added; "changed" covers the answer, tags, image, option order...
+    """
+    added = [question for uid, question in current.items() if uid not in previous]
+    changed = [
+        question for uid, question in current.items()
+        if uid in previous and previous[uid] != fingerprint(question)
+    ]
+    removed = sorted(uid for uid in previous if uid not in current)
+    if not (added or changed or removed):
+        return None
+    return {"added": added, "changed": changed, "removed": removed}
+
+def load_snapshot(path: Path) -> Tuple[int, Dict[str, FileSnapshot]]:
+    """Return (release, {test_id: file snapshot}) of the last release, or (0, {}) if there is none"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return 0, {}
+    if snapshot.get('format') != SNAPSHOT_FORMAT:
+        print(f"  ⚠️  {path.name} has an unknown format, starting a new release history")
+        return 0, {}
+    return snapshot['release'], snapshot['files']
+
+def build_delta_manifest(data_dir: Path, snapshot_path: Path, output_dir: Path,
+                         keep: int = DEFAULT_KEEP, check: bool = False) -> bool:
+    """
+    Compare the question files of data_dir with the snapshot of the last release.
+    If any question was added, removed or changed, start a new release: write
+    <output_dir>/<release>.json with the delta of every changed file and update
+    the snapshot. <output_dir>/latest.json always describes the current release.
+
+    A client that has release r cached fetches latest.json; if r is older, it
+    applies the deltas r+1 .. latest if they are all still kept (r >= oldest - 1)
+    and otherwise fetches the whole files.
+
+    This is a release step, not a build step: the snapshot and the delta files
+    are only durable because they are committed, and a build starting from the
+    committed snapshot would number its own release. A delta that already
+    exists with other content is never overwritten (the snapshot is behind the
+    committed deltas); that exits with an error instead.
+    With check=True nothing is written; the build uses it to refuse data that
+    has changed since the last committed release.
+    Returns True if the data needs (or got) a new release.
+    """
+    files = list_data_files(data_dir)
+    print(f"Found {len(files)} JSON files in '{data_dir}'")
+
+    release, previous = load_snapshot(snapshot_path)
+
+    current: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for file_path in files:
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                current[file_path.stem] = keyed_questions(json.load(f))
+        except (OSError, ValueError) as e:
+            # json.JSONDecodeError is a ValueError; keep the file as it was in the last release
+            print(f"  ❌ Error reading {file_path.name}: {e}")
+
+    snapshots = {
+        test_id: {uid: fingerprint(question) for uid, question in questions.items()}
+        for test_id, questions in current.items()
+    }
+    for test_id in previous:
+        if test_id not in snapshots and (data_dir / f"{test_id}.json").exists():
+            snapshots[test_id] = previous[test_id]
+
+    deltas = {}
+    for test_id in sorted(set(previous) | set(snapshots)):
+        if test_id not in snapshots:
+            deltas[test_id] = {"added": [], "changed": [], "removed": sorted(previous[test_id]), "deleted": True}
+            continue
+        delta = diff_file(previous.get(test_id, {}), current.get(test_id, {})) if test_id in current else None
+        if delta is not None:
+            deltas[test_id] = delta
+
+    for test_id, delta in deltas.items():
+        if delta.get("deleted"):
+            print(f"\n🗑️  {test_id}: removed ({len(delta['removed'])} questions)")
+        else:
+            print(f"\n✅ {test_id}: {len(delta['added'])} added, {len(delta['changed'])} changed, "
+                  f"{len(delta['removed'])} removed")
+
+    released = bool(deltas) or release == 0
+    if check:
+        print(f"\n{'='*50}")
+        print(f"SUMMARY:")
+        print(f"Files read: {len(current)}/{len(files)}")
+        print(f"Release: {release}")
+        print(f"Files changed since that release: {len(deltas)}")
+        print(f"{'='*50}")
+        return released
+
+    if released:
+        release += 1
+        # The first release has nothing to be a delta of: clients start with the whole files
+        if release > 1:
+            delta_path = output_dir / f"{release}.json"
+            encoded = json.dumps({"release": release, "previous": release - 1, "files": deltas},
+                                 ensure_ascii=False, separators=(',', ':'))
+            if delta_path.exists() and delta_path.read_text(encoding='utf-8') != encoded:
+                sys.exit(f"❌ {delta_path} already exists with other content, so {snapshot_path.name} is "
+                         f"behind the committed deltas. Restore both from git before making a release.")
+            write_if_changed(delta_path, encoded)
+        write_if_changed(snapshot_path, json.dumps(
+            {"format": SNAPSHOT_FORMAT, "release": release, "files": snapshots}, indent=2, sort_keys=True
+        ) + '\n')
+
+    # Deltas older than `keep` releases are dropped; clients that far behind refetch whole files
+    oldest = max(2, release - keep + 1)
+    kept = 0
+    for delta_path in sorted(output_dir.glob('*.json')) if output_dir.exists() else []:
+        if not delta_path.stem.isdigit():
+            continue
+        if int(delta_path.stem) < oldest or int(delta_path.stem) > release:
+            delta_path.unlink()
+            print(f"\n🗑️  Removed old delta {delta_path.name}")
+        else:
+            kept += 1
+
+    latest = {
+        "release": release,
+        "oldest": oldest if kept else release + 1,
+        "files": {
+            test_id: {"questions": len(snapshot), "hash": snapshot_hash(snapshot)}
+            for test_id, snapshot in sorted(snapshots.items())
+        },
+    }
+    latest_written = write_if_changed(output_dir / LATEST_NAME, json.dumps(latest, indent=2) + '\n')
+
+    print(f"\n{'='*50}")
+    print(f"SUMMARY:")
+    print(f"Files read: {len(current)}/{len(files)}")
+    print(f"Release: {release}{' (new)' if released else ' (unchanged)'}")
+    print(f"Files changed since the previous release: {len(deltas)}")
+    print(f"Deltas kept: {kept} (releases {oldest}-{release})" if kept else f"Deltas kept: 0")
+    print(f"Latest manifest {'updated' if latest_written else 'unchanged'}: {output_dir / LATEST_NAME}")
+    print(f"{'='*50}")
+    return released
+
+def main():
+    """Main function to build the delta manifest of ../src/data into ../public/releases"""
+    script_dir = Path(__file__).parent.absolute()
+    data_dir = (script_dir / ".." / "src" / "data").resolve()
+
+    parser = argparse.ArgumentParser(
+        description="Record a release of the test data and the per-file delta (questions added, removed or changed) "
+                    "since the previous one"
+    )
+    parser.add_argument('--output', type=Path, default=(script_dir / ".." / "public" / "releases").resolve(),
+                        help="directory for latest.json and the delta files (default: public/releases)")
+    parser.add_argument('--snapshot', type=Path, default=data_dir / "releases" / SNAPSHOT_NAME,
+                        help="snapshot of the last release (default: src/data/releases/snapshot.json)")
+    parser.add_argument('--keep', type=int, default=DEFAULT_KEEP,
+                        help="number of delta files to keep (default: %(default)s)")
+    parser.add_argument('--check', action='store_true',
+                        help="write nothing; exit with an error if the data changed since the last release")
+    args = parser.parse_args()
+
+    if args.check:
+        print(f"Checking the test files in {data_dir} against the last release")
+        if build_delta_manifest(data_dir, args.snapshot, args.output, max(1, args.keep), check=True):
+            sys.exit("❌ The test data changed since the last release. Run `bun run release-data` and commit "
+                     "src/data/releases/ and public/releases/, so clients see the change.")
+        return
+
+    print(f"Building the delta manifest of all test files in: {data_dir}")
+    build_delta_manifest(data_dir, args.snapshot, args.output, max(1, args.keep))
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,53 @@
 #!/usr/bin/env python3
 
+import argparse
+import hashlib
 import json
+import os
 import re
 import subprocess
 import tempfile
-import os
 import sys
 import platform
+from functools import lru_cache, partial
 from pathlib import Path
 
+import profiling
+from manifest import Manifest, list_data_files
+from output import encode_questions, format_bytes_saved, write_if_changed
+from parallel import map_files
+
+# Bump whenever a change here can produce different output for the same input
+TOOL_VERSION = "2"
+
+CPP_CODE_BLOCK_REGEX = re.compile(r'```cpp\s*([\s\S]*?)\s*```', re.MULTILINE)
+
+# What TextRenderer.vue hands to KaTeX ($$display$$, then $inline$) and to
+# highlight.js (any ``` fence), in the order it replaces them
+LATEX_DISPLAY_REGEX = re.compile(r'\$\$([^$]+)\$\$')
+LATEX_INLINE_REGEX = re.compile(r'\$([^$]+)\$')
+CODE_BLOCK_REGEX = re.compile(r'```(?:[A-Za-z0-9_]+)?\s*([\s\S]*?)\s*```')
+
+# Render hint flags. A question's "render" field holds one hex digit of them per
+# text, the question first and then each option, so the client can skip the
+# scans above for plain text and only load KaTeX/highlight.js when needed.
+RENDER_INLINE_MATH = 1
+RENDER_DISPLAY_MATH = 2
+RENDER_CODE_BLOCK = 4
+RENDER_IMAGE = 8
+
+# Maximum number of snippets formatted by a single clang-format run
+BATCH_SIZE = 200
+
+# Where formatted snippets are cached between runs, and how large the cache may grow
+DEFAULT_CACHE_DIR = Path(__file__).parent.absolute() / '.cache' / 'clang-format'
+DEFAULT_CACHE_SIZE = 16 * 1024 * 1024
+
+@lru_cache(maxsize=None)
 def find_clang_format():
     """
-    Find clang-format executable, first in script directory, then in PATH
+    Find clang-format executable, first in script directory, then in PATH.
+    The result is cached, so the lookup only happens once per process.
     """
     script_dir = Path(__file__).parent.absolute()
     
@@ -44,9 +80,11 @@ def find_clang_format():
     
     return None
 
-def format_cpp_with_clang(code):
+@lru_cache(maxsize=None)
+def clang_format_command():
     """
-    Format C++ code using clang-format with custom config
+    Build the clang-format command line (executable and style), or None if clang-format
+    is not available. Cached, so the setup messages are printed only once.
     """
     clang_format_path = find_clang_format()
     script_dir = Path(__file__).parent.absolute()
@@ -59,44 +97,45 @@ def format_cpp_with_clang(code):
         print("   - Ubuntu/Debian: sudo apt install clang-format")
         print("   - macOS: brew install clang-format") 
         print("   - Windows: Install LLVM from https://llvm.org/")
+        return None
+    
+    # Check for .clang-format config file in script directory
+    clang_format_config = script_dir / '.clang-format'
+    
+    if clang_format_config.exists():
+        style = f'-style=file:{clang_format_config}'
+    else:
+        print("No .clang-format config found, using Google style")
+        # Fallback to Google style
+        style = '-style=Google'
+    
+    return (clang_format_path, style)
+
+def run_clang_format(source):
+    """
+    Run clang-format once over source through stdin/stdout
+    """
+    with profiling.span('format-subprocess'):
+        result = subprocess.run(
+            [*clang_format_command(), '--assume-filename=block.cpp'],
+            input=source,
+            capture_output=True,
+            text=True,
+            encoding='utf-8',
+            check=True,
+            cwd=Path(__file__).parent.absolute()  # Run from script directory
+        )
+    return result.stdout
+
+def format_cpp_with_clang(code):
+    """
+    Format C++ code using clang-format with custom config
+    """
+    if not clang_format_command():
         return code
     
     try:
-        # Create a temporary file with .cpp extension
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.cpp', delete=False) as temp_file:
-            temp_file.write(code)
-            temp_file_path = temp_file.name
-        
-        # Check for .clang-format config file in script directory
-        clang_format_config = script_dir / '.clang-format'
-        
-        if clang_format_config.exists():
-            # Run clang-format from the script directory so it finds the config
-            subprocess.run(
-                [clang_format_path, f'-style=file:{clang_format_config}', '-i', temp_file_path],
-                capture_output=True,
-                text=True,
-                check=True,
-                cwd=script_dir  # Run from script directory
-            )
-        else:
-            print("No .clang-format config found, using Google style")
-            # Fallback to Google style
-            subprocess.run(
-                [clang_format_path, '-style=Google', '-i', temp_file_path],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-        
-        # Read back the formatted code
-        with open(temp_file_path, 'r') as f:
-            formatted_code = f.read()
-            
-        # Clean up the temporary file
-        os.unlink(temp_file_path)
-        
-        return formatted_code.strip()
+        return run_clang_format(code).strip()
     
     except subprocess.CalledProcessError as e:
         print(f"Error running clang-format: {e}")
@@ -105,13 +144,179 @@ def format_cpp_with_clang(code):
         print(f"Unexpected error: {e}")
         return code
 
-def format_code_blocks_in_text(text):
+@lru_cache(maxsize=None)
+def clang_format_fingerprint():
     """
-    Find and format only ```cpp code blocks using clang-format in a string
+    Describe the formatter setup (clang-format version and style config) so that
+    cached results are invalidated whenever either of them changes
+    """
+    command = clang_format_command()
+    if not command:
+        return None
+    
+    version = subprocess.run(
+        [command[0], '--version'], capture_output=True, text=True, check=True
+    ).stdout.strip()
+    
+    clang_format_config = Path(__file__).parent.absolute() / '.clang-format'
+    config = clang_format_config.read_text(encoding='utf-8') if clang_format_config.exists() else command[1]
+    
+    return f"{version}\n{config}"
+
+def tool_version():
     """
-    # Only match code blocks specifically marked as cpp
-    cpp_code_block_regex = r'```cpp\s*([\s\S]*?)\s*```'
+    Version recorded in the manifest: the script version plus the formatter setup,
+    so files are reformatted after a clang-format upgrade or a style change
+    """
+    fingerprint = clang_format_fingerprint() or "no-clang-format"
+    return f"{TOOL_VERSION}+{hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()[:12]}"
+
+class FormatCache:
+    """
+    Content-addressed on-disk cache of formatted C++ snippets.
+    Each entry is a file named after the hash of (snippet, clang-format version,
+    .clang-format contents). Reading an entry refreshes its mtime, and evict()
+    drops the least recently used entries once the cache exceeds max_bytes.
+    """
+    
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_SIZE):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+    
+    def _entry_path(self, code):
+        digest = hashlib.sha256(f"{clang_format_fingerprint()}\0{code}".encode('utf-8')).hexdigest()
+        return self.cache_dir / digest[:2] / digest
     
+    def get(self, code):
+        """Return the cached formatted version of code, or None"""
+        path = self._entry_path(code)
+        try:
+            formatted = path.read_text(encoding='utf-8')
+        except (FileNotFoundError, UnicodeDecodeError):
+            self.misses += 1
+            return None
+        
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return formatted
+    
+    def put(self, code, formatted):
+        """Store the formatted version of code"""
+        path = self._entry_path(code)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a private file first so parallel workers never see partial entries
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        temp_path.write_text(formatted, encoding='utf-8')
+        os.replace(temp_path, path)
+    
+    def entries(self):
+        """List the cache entry files"""
+        if not self.cache_dir.exists():
+            return []
+        return [path for path in self.cache_dir.glob('*/*') if path.is_file() and path.suffix != '.tmp']
+    
+    def evict(self):
+        """
+        Remove least recently used entries until the cache fits in max_bytes.
+        Returns the number of entries removed.
+        """
+        entries = []
+        for path in self.entries():
+            stat = path.stat()
+            entries.append((stat.st_mtime, stat.st_size, path))
+        
+        total_size = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total_size <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total_size -= size
+            removed += 1
+        
+        return removed
+    
+    def clear(self):
+        """Remove every entry. Returns the number of entries removed."""
+        entries = self.entries()
+        for path in entries:
+            path.unlink(missing_ok=True)
+        return len(entries)
+
+def format_cpp_batch(codes, cache=None):
+    """
+    Format many C++ snippets with as few clang-format runs as possible.
+    Every snippet gets its own file so it is parsed in isolation (snippets are often
+    incomplete pseudo-code that would otherwise leak into the next one), and each
+    run formats up to BATCH_SIZE files in place. A failed run falls back to
+    formatting its snippets one by one.
+    Snippets found in `cache` (a FormatCache) skip clang-format entirely, and
+    newly formatted ones are added to it.
+    Returns a dict mapping each snippet to its formatted version.
+    """
+    unique_codes = list(dict.fromkeys(codes))
+    command = clang_format_command()
+    
+    if not unique_codes or not command:
+        return {code: code for code in unique_codes}
+    
+    formatted = {}
+    
+    if cache is not None:
+        for code in unique_codes:
+            cached = cache.get(code)
+            if cached is not None:
+                formatted[code] = cached
+        unique_codes = [code for code in unique_codes if code not in formatted]
+        
+        if not unique_codes:
+            return formatted
+    
+    with tempfile.TemporaryDirectory(prefix='format_code_blocks-') as temp_dir:
+        for start in range(0, len(unique_codes), BATCH_SIZE):
+            batch = unique_codes[start:start + BATCH_SIZE]
+            paths = [Path(temp_dir) / f'block{start + i}.cpp' for i in range(len(batch))]
+            
+            for path, code in zip(paths, batch):
+                path.write_text(code, encoding='utf-8')
+            
+            try:
+                with profiling.span('format-subprocess'):
+                    subprocess.run(
+                        [*command, '-i', *map(str, paths)],
+                        capture_output=True,
+                        text=True,
+                        check=True,
+                        cwd=Path(__file__).parent.absolute()  # Run from script directory
+                    )
+            except (subprocess.CalledProcessError, OSError):
+                for code in batch:
+                    formatted[code] = format_cpp_with_clang(code)
+                continue
+            
+            for path, code in zip(paths, batch):
+                formatted[code] = path.read_text(encoding='utf-8').strip()
+                if cache is not None:
+                    cache.put(code, formatted[code])
+    
+    return formatted
+
+def find_cpp_blocks(text):
+    """
+    Return the code of every ```cpp block in a string
+    """
+    return [match.group(1) for match in CPP_CODE_BLOCK_REGEX.finditer(text)]
+
+def format_code_blocks_in_text(text, formatter=format_cpp_with_clang):
+    """
+    Find and format only ```cpp code blocks using clang-format in a string.
+    `formatter` maps a block's code to its formatted version.
+    """
     blocks_formatted = 0
     
     def replace_cpp_block(match):
@@ -120,7 +325,7 @@ def format_code_blocks_in_text(text):
         
         # Check if code needs formatting (simple check to avoid re-formatting identical code if possible,
         # but clang-format is idempotent so it's fine to run it)
-        formatted_code = format_cpp_with_clang(code)
+        formatted_code = formatter(code)
         
         if formatted_code != code.strip():
             blocks_formatted += 1
@@ -128,19 +333,79 @@ def format_code_blocks_in_text(text):
         return f"```cpp\n{formatted_code}\n```"
     
     # Apply the regex replacement only to cpp blocks
-    result = re.sub(cpp_code_block_regex, replace_cpp_block, text, flags=re.MULTILINE)
+    result = CPP_CODE_BLOCK_REGEX.sub(replace_cpp_block, text)
     
     return result, blocks_formatted
 
-def process_question(question_obj):
+def question_texts(question_obj):
+    """
+    Yield the string fields of a question that may contain code blocks
+    """
+    if 'question' in question_obj and isinstance(question_obj['question'], str):
+        yield question_obj['question']
+    if 'options' in question_obj and isinstance(question_obj['options'], list):
+        for opt in question_obj['options']:
+            if isinstance(opt, str):
+                yield opt
+
+def render_flags(text):
+    """
+    Render hint flags of one text: which of TextRenderer's math and code
+    replacements would match it
+    """
+    flags = 0
+    if LATEX_DISPLAY_REGEX.search(text):
+        flags |= RENDER_DISPLAY_MATH
+        text = LATEX_DISPLAY_REGEX.sub('', text)
+    if LATEX_INLINE_REGEX.search(text):
+        flags |= RENDER_INLINE_MATH
+        text = LATEX_INLINE_REGEX.sub('', text)
+    if CODE_BLOCK_REGEX.search(text):
+        flags |= RENDER_CODE_BLOCK
+    return flags
+
+def render_hints(question_obj):
+    """
+    Compute the "render" field of a question: a hex digit of flags for the
+    question text (plus RENDER_IMAGE if it has an image), then one per option
     """
-    Process a single question object (dict) to format code blocks in its fields
+    question_text = question_obj.get('question')
+    question_flags = render_flags(question_text) if isinstance(question_text, str) else 0
+    if question_obj.get('image'):
+        question_flags |= RENDER_IMAGE
+    
+    option_flags = [render_flags(opt) if isinstance(opt, str) else 0 for opt in question_obj.get('options') or []]
+    return ''.join(f'{flags:x}' for flags in [question_flags, *option_flags])
+
+def count_renderers(data):
+    """
+    Count the questions of a file that need each renderer, from their render hints
+    """
+    counts = {"KaTeX": 0, "highlight.js": 0, "images": 0}
+    for question in data:
+        flags = 0
+        for digit in question.get('render', ''):
+            flags |= int(digit, 16)
+        counts["KaTeX"] += bool(flags & (RENDER_INLINE_MATH | RENDER_DISPLAY_MATH))
+        counts["highlight.js"] += bool(flags & RENDER_CODE_BLOCK)
+        counts["images"] += bool(flags & RENDER_IMAGE)
+    return counts
+
+def format_renderers(counts, total):
+    """Describe renderer counts for the logs and SUMMARY blocks"""
+    return f"KaTeX {counts['KaTeX']}, highlight.js {counts['highlight.js']}, images {counts['images']} (of {total} questions)"
+
+def process_question(question_obj, formatter=format_cpp_with_clang):
+    """
+    Process a single question object (dict) to format code blocks in its fields,
+    then update its render hints.
+    Returns (blocks_formatted, hints_changed).
     """
     blocks_count = 0
     
     # Format 'question' field
     if 'question' in question_obj and isinstance(question_obj['question'], str):
-        formatted_text, count = format_code_blocks_in_text(question_obj['question'])
+        formatted_text, count = format_code_blocks_in_text(question_obj['question'], formatter)
         if count > 0:
             question_obj['question'] = formatted_text
             blocks_count += count
@@ -150,52 +415,100 @@ def process_question(question_obj):
         new_options = []
         for opt in question_obj['options']:
             if isinstance(opt, str):
-                formatted_opt, count = format_code_blocks_in_text(opt)
+                formatted_opt, count = format_code_blocks_in_text(opt, formatter)
                 if count > 0:
                     blocks_count += count
                 new_options.append(formatted_opt)
             else:
                 new_options.append(opt)
         question_obj['options'] = new_options
+    
+    hints = render_hints(question_obj)
+    hints_changed = question_obj.get('render') != hints
+    question_obj['render'] = hints
         
-    return blocks_count
+    return blocks_count, hints_changed
 
-def process_file(file_path):
+def format_questions(data, cache=None):
     """
-    Process a single JSON file
+    Format the code blocks of a list of question objects in place and update
+    their render hints.
+    All blocks are formatted together in batched clang-format runs, reusing
+    results from `cache` (a FormatCache) when given.
+    Returns (blocks_changed, questions_with_changed_hints).
     """
+    codes = [code for question in data for text in question_texts(question) for code in find_cpp_blocks(text)]
+    formatted = format_cpp_batch(codes, cache)
+    
+    total_blocks = 0
+    hints_changed = 0
+    for question in data:
+        blocks_count, changed = process_question(question, formatted.__getitem__)
+        total_blocks += blocks_count
+        hints_changed += changed
+    
+    return total_blocks, hints_changed
+
+def process_file(file_path, cache=None, compact=False):
+    """
+    Process a single JSON file.
+    All code blocks of the file are formatted together in batched clang-format runs,
+    reusing results from `cache` (a FormatCache) when given. With `compact`, the file
+    is (re)written in the compact output profile.
+    Returns (blocks_formatted, cache_hits, cache_misses, bytes_saved, renderers), or None
+    if the file could not be processed.
+    """
+    hits_before = cache.hits if cache is not None else 0
+    misses_before = cache.misses if cache is not None else 0
+    
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        with profiling.span('read'):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                raw = f.read()
+        with profiling.span('decode'):
+            data = json.loads(raw)
             
         if not isinstance(data, list):
             print(f"  ⚪ Skipping {file_path.name}: Not a list of questions")
-            return 0
-            
-        total_file_blocks = 0
+            return 0, 0, 0, 0, count_renderers([])
         
-        for question in data:
-            total_file_blocks += process_question(question)
+        with profiling.span('format'):
+            total_file_blocks, hints_changed = format_questions(data, cache)
+        bytes_saved = 0
             
+        if total_file_blocks > 0 or hints_changed > 0 or compact:
+            with profiling.span('encode'):
+                output = encode_questions(data, compact)
+            with profiling.span('write'):
+                if write_if_changed(file_path, output):
+                    bytes_saved = len(raw.encode('utf-8')) - len(output.encode('utf-8'))
+        
         if total_file_blocks > 0:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
             print(f"  ✅ Formatted {total_file_blocks} C++ code blocks in {file_path.name}")
         else:
             print(f"  ⚪ No C++ code blocks formatted in {file_path.name}")
-            
-        return total_file_blocks
+        renderers = count_renderers(data)
+        print(f"  🎨 Needs {format_renderers(renderers, len(data))}")
+        if compact:
+            print(f"  📦 Compact output: {format_bytes_saved(len(raw.encode('utf-8')), len(output.encode('utf-8')))}")
+        
+        if cache is not None:
+            return total_file_blocks, cache.hits - hits_before, cache.misses - misses_before, bytes_saved, renderers
+        return total_file_blocks, 0, 0, bytes_saved, renderers
         
     except json.JSONDecodeError:
         print(f"  ❌ Error: {file_path.name} is not valid JSON")
-        return 0
+        return None
     except Exception as e:
         print(f"  ❌ Error processing {file_path.name}: {e}")
-        return 0
+        return None
 
-def process_directory(input_dir):
+def process_directory(input_dir, jobs=1, cache=None, force=False, compact=False):
     """
-    Process all JSON files in a directory
+    Process all JSON files in a directory, optionally spreading them over `jobs` processes
+    and reusing formatted blocks from `cache` (a FormatCache).
+    Files left unchanged since the last run (according to the manifest) are skipped
+    unless `force` is set. With `compact`, files are written in the compact output profile.
     """
     input_path = Path(input_dir)
     
@@ -208,7 +521,7 @@ def process_directory(input_dir):
         return
     
     # Get all JSON files in the directory
-    files = [f for f in input_path.iterdir() if f.is_file() and f.suffix == '.json']
+    files = list_data_files(input_path)
     
     if not files:
         print(f"No JSON files found in '{input_path}'")
@@ -216,33 +529,87 @@ def process_directory(input_dir):
     
     print(f"Found {len(files)} JSON files in '{input_path}'")
     
+    manifest = Manifest(input_path, "format_code_blocks", tool_version() + ("+compact" if compact else ""))
+    pending = files if force else [f for f in files if not manifest.is_unchanged(f)]
+    skipped_files = len(files) - len(pending)
+    if skipped_files:
+        print(f"Skipping {skipped_files} unchanged file(s) (use --force to reprocess them)")
+    
     total_blocks = 0
     processed_files = 0
+    cache_hits = 0
+    cache_misses = 0
+    bytes_saved = {}
+    renderers = {}
     
-    for file_path in files:
-        print(f"\nProcessing: {file_path.name}")
-        blocks_formatted = process_file(file_path)
+    for file_path, result in map_files(partial(process_file, cache=cache, compact=compact), pending, jobs):
+        if result is None:
+            continue
         
+        manifest.record(file_path)
+        blocks_formatted, hits, misses, saved, file_renderers = result
+        renderers[file_path.name] = file_renderers
+        if compact:
+            bytes_saved[file_path.name] = saved
+        cache_hits += hits
+        cache_misses += misses
         if blocks_formatted > 0:
             total_blocks += blocks_formatted
             processed_files += 1
     
+    manifest.prune(files)
+    manifest.save()
+    evicted = cache.evict() if cache is not None else 0
+    
     print(f"\n{'='*50}")
     print(f"SUMMARY:")
     print(f"Files processed: {processed_files}/{len(files)}")
+    if skipped_files:
+        print(f"Files skipped (unchanged): {skipped_files}")
     print(f"Total C++ blocks formatted: {total_blocks}")
+    if cache is not None:
+        print(f"Cache: {cache_hits} hit(s), {cache_misses} miss(es), {evicted} evicted")
+    if renderers:
+        print(f"Questions needing each renderer:")
+        for file_name, counts in renderers.items():
+            print(f"  {file_name}: KaTeX {counts['KaTeX']}, highlight.js {counts['highlight.js']}, images {counts['images']}")
+    if compact:
+        print(f"Bytes saved by compact output:")
+        for file_name, saved in bytes_saved.items():
+            print(f"  {file_name}: {saved:,}")
+        print(f"  Total: {sum(bytes_saved.values()):,}")
     print(f"{'='*50}")
 
 def main():
     """
     Main function
     """
+    parser = argparse.ArgumentParser(description="Format ```cpp code blocks in the test data files with clang-format")
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="number of files to process in parallel (0 = one per CPU, default: 1)")
+    parser.add_argument('--force', action='store_true',
+                        help="reprocess every file, even those unchanged since the last run")
+    parser.add_argument('--compact', action='store_true',
+                        help="write minified JSON without empty optional fields")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="always run clang-format instead of reusing cached results")
+    parser.add_argument('--clear-cache', action='store_true',
+                        help="empty the formatted block cache before running")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    
+    cache = None if args.no_cache else FormatCache()
+    if args.clear_cache:
+        removed = FormatCache().clear()
+        print(f"Cleared {removed} cached block(s) from {DEFAULT_CACHE_DIR}")
+    
     # Process ../src/data directory
     script_dir = Path(__file__).parent.absolute()
     data_dir = script_dir / ".." / "src" / "data"
     
     print(f"Processing all JSON files in: {data_dir.resolve()}")
-    process_directory(data_dir)
+    with profiling.session(args):
+        process_directory(data_dir, args.jobs, cache, args.force, args.compact)
 
 if __name__ == "__main__":
     main()
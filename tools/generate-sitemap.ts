@@ -10,7 +10,7 @@ async function main() {
 
   try {
     const files = await readdir(DATA_DIR)
-    const jsonFiles = files.filter((f) => f.endsWith(".json"))
+    const jsonFiles = files.filter((f) => f.endsWith(".json") && !f.startsWith("."))
     const routes = ["/"]
 
     for (const file of jsonFiles) {
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+from output import write_if_changed
+
+# Stored next to the data; the leading dot keeps it out of the question file listings
+MANIFEST_NAME = '.manifest.json'
+MANIFEST_FORMAT = 1
+
+def list_data_files(input_dir: Path) -> List[Path]:
+    """
+    List the question files of a data directory in a stable order,
+    leaving out hidden files such as the manifest
+    """
+    return sorted(
+        f for f in input_dir.iterdir()
+        if f.is_file() and f.suffix == '.json' and not f.name.startswith('.')
+    )
+
+def file_digest(file_path: Path) -> str:
+    """SHA-256 of a file's contents"""
+    return hashlib.sha256(file_path.read_bytes()).hexdigest()
+
+class Manifest:
+    """
+    Record of the data files a tool has already processed.
+
+    Each tool keeps its own section mapping file names to the mtime, size and
+    content hash the file had right after the tool last handled it, plus the
+    tool version that handled it. A file is unchanged when its mtime and size
+    still match, or, if only the mtime moved, when its content hash does.
+    """
+
+    def __init__(self, data_dir: Path, tool: str, tool_version: str):
+        self.path = data_dir / MANIFEST_NAME
+        self.tool = tool
+        self.tool_version = tool_version
+        self.entries: Dict[str, Dict[str, Any]] = self.load()["tools"].get(tool, {})
+
+    def load(self) -> Dict[str, Any]:
+        """Read the manifest file, or return an empty one if it is missing or unreadable"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                loaded = json.load(f)
+            if isinstance(loaded, dict) and loaded.get("format") == MANIFEST_FORMAT:
+                return loaded
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        return {"format": MANIFEST_FORMAT, "tools": {}}
+
+    def is_unchanged(self, file_path: Path) -> bool:
+        """Check whether file_path is exactly as this tool version last left it"""
+        entry = self.entries.get(file_path.name)
+        if not entry or entry.get("tool_version") != self.tool_version:
+            return False
+
+        stat = file_path.stat()
+        if stat.st_size != entry["size"]:
+            return False
+        if stat.st_mtime_ns == entry["mtime_ns"]:
+            return True
+
+        # Touched but possibly not modified (checkout, copy): fall back to the content hash
+        if file_digest(file_path) != entry["sha256"]:
+            return False
+        entry["mtime_ns"] = stat.st_mtime_ns
+        return True
+
+    def record(self, file_path: Path) -> None:
+        """Remember the current state of file_path as processed"""
+        stat = file_path.stat()
+        self.entries[file_path.name] = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": file_digest(file_path),
+            "tool_version": self.tool_version,
+        }
+
+    def prune(self, existing: Iterable[Path]) -> None:
+        """Forget files that are no longer in the data directory"""
+        names = {file_path.name for file_path in existing}
+        for name in [name for name in self.entries if name not in names]:
+            del self.entries[name]
+
+    def save(self) -> None:
+        """
+        Write this tool's section back (atomically, and only if it changed).
+        The file is read again first, so sections other tools saved since this
+        one was loaded (a long watch.py session, tools run side by side) are kept.
+        """
+        data = self.load()
+        data["tools"][self.tool] = self.entries
+        write_if_changed(self.path, json.dumps(data, indent=2, sort_keys=True) + '\n')
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+
+import argparse
+import hashlib
+import io
+import json
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+try:
+    import PIL
+    from PIL import Image, features
+except ImportError:
+    # Only needed to encode new images; everything else works without it
+    PIL = None
+
+from manifest import list_data_files
+from output import encode_questions, write_if_changed
+from parallel import map_files
+
+# Bump whenever a change here can produce different variants for the same image
+TOOL_VERSION = "1"
+
+INDEX_NAME = 'index.json'
+
+# Variant widths in pixels; an image gets those narrower than itself, plus its own width
+DEFAULT_WIDTHS = [480, 960, 1440]
+WEBP_QUALITY = 80
+AVIF_QUALITY = 55
+
+# Length of the content hash used as file name
+HASH_LENGTH = 12
+
+def content_name(file_path: Path) -> str:
+    """Content-addressed name of an image: a hash of its bytes plus its extension"""
+    digest = hashlib.sha256(file_path.read_bytes()).hexdigest()[:HASH_LENGTH]
+    return f"{digest}{file_path.suffix.lower()}"
+
+def variant_name(name: str, width: int, image_format: str) -> str:
+    """gpi.png, 480, webp -> <hash>-480w.webp"""
+    return f"{Path(name).stem}-{width}w.{image_format}"
+
+def available_formats() -> List[str]:
+    """Formats this Pillow build can write, in order of preference (smallest first)"""
+    if PIL is None:
+        return []
+    return [image_format for image_format in ('avif', 'webp') if features.check(image_format)]
+
+def encoder_fingerprint(widths: List[int], formats: List[str]) -> str:
+    """Describe the encoder setup so variants are re-encoded whenever it changes"""
+    pillow = PIL.__version__ if PIL is not None else "none"
+    return f"{TOOL_VERSION} pillow-{pillow} {','.join(formats)} webp{WEBP_QUALITY} avif{AVIF_QUALITY} {widths}"
+
+def variant_widths(width: int, widths: List[int]) -> List[int]:
+    """Variant widths for an image `width` pixels wide (never upscaled)"""
+    largest = min(width, max(widths))
+    return [w for w in widths if w < largest] + [largest]
+
+def encode_image(source: Path, image_dir: Path, widths: List[int], formats: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    Encode one image into every format at every variant width.
+    Returns its index entry (size and variants), or None if it could not be encoded.
+    """
+    try:
+        with Image.open(source) as image:
+            image.load()
+            width, height = image.size
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'transparency' in image.info or 'A' in image.mode else 'RGB')
+
+            variants: Dict[str, List[int]] = {}
+            encoded_bytes = 0
+            for w in variant_widths(width, widths):
+                resized = image if w == width else image.resize((w, round(height * w / width)), Image.LANCZOS)
+                for image_format in formats:
+                    buffer = io.BytesIO()
+                    quality = AVIF_QUALITY if image_format == 'avif' else WEBP_QUALITY
+                    resized.save(buffer, format=image_format.upper(), quality=quality)
+                    write_if_changed(image_dir / variant_name(source.name, w, image_format), buffer.getvalue())
+                    encoded_bytes += buffer.tell()
+                    variants.setdefault(image_format, []).append(w)
+    except Exception as e:
+        print(f"  ❌ Error encoding {source.name}: {e}")
+        return None
+
+    sizes = '; '.join(f"{image_format} {', '.join(map(str, ws))}" for image_format, ws in variants.items())
+    print(f"  ✅ {width}x{height}: {sizes} ({encoded_bytes:,} bytes)")
+    return {"width": width, "height": height, "variants": variants}
+
+def collect_references(files: List[Path]) -> Tuple[Dict[Path, List[Dict[str, Any]]], Dict[str, List[str]]]:
+    """
+    Load every question file and list where each image is used.
+    Returns (data by file, image name -> ["file #id", ...]).
+    """
+    data_by_file = {}
+    references: Dict[str, List[str]] = {}
+    for file_path in files:
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"  ❌ Error reading {file_path.name}: {e}")
+            continue
+        data_by_file[file_path] = data
+        for question in data:
+            image = question.get('image')
+            if image:
+                references.setdefault(image, []).append(f"{file_path.name} #{question.get('id')}")
+    return data_by_file, references
+
+def optimize_images(data_dir: Path, image_dir: Path, index_path: Path, widths: List[int],
+                    jobs: int = 1, compact: bool = False, remove_orphans: bool = False) -> None:
+    """
+    Give every image referenced by the question files a content-addressed name
+    (identical images share one file), encode WebP/AVIF variants of each distinct
+    image, point the `image` fields at the new names and write the variant index
+    the client builds its srcsets from.
+    Images whose variants already exist with the same encoder setup are skipped.
+    """
+    files = list_data_files(data_dir)
+    print(f"Found {len(files)} JSON files in '{data_dir}'")
+    data_by_file, references = collect_references(files)
+
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index: Dict[str, Any] = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        index = {}
+
+    formats = available_formats()
+    fingerprint = encoder_fingerprint(widths, formats)
+
+    # Old name -> content-addressed name, and one source file per distinct content
+    renames: Dict[str, str] = {}
+    sources: Dict[str, Path] = {}
+    missing: List[str] = []
+    for name in sorted(references):
+        source = image_dir / name
+        if not source.is_file():
+            missing.append(name)
+            continue
+        hashed = content_name(source)
+        renames[name] = hashed
+        sources.setdefault(hashed, source)
+        # The content-addressed copy doubles as the fallback for browsers without WebP/AVIF
+        write_if_changed(image_dir / hashed, source.read_bytes())
+
+    def is_current(hashed: str) -> bool:
+        entry = index.get(hashed)
+        return bool(entry) and entry.get("encoder") == fingerprint and all(
+            (image_dir / variant_name(hashed, w, image_format)).is_file()
+            for image_format, ws in entry["variants"].items() for w in ws
+        )
+
+    pending = [image_dir / hashed for hashed in sorted(sources) if not is_current(hashed)]
+    encoded = 0
+    if pending and PIL is None:
+        print("\n  ❌ Pillow is not installed (pip install pillow): new images were not encoded")
+    elif pending:
+        encode = partial(encode_image, image_dir=image_dir, widths=widths, formats=formats)
+        for source, entry in map_files(encode, pending, jobs, header="Encoding"):
+            if entry is not None:
+                index[source.name] = {**entry, "encoder": fingerprint}
+                encoded += 1
+
+    index = {hashed: index[hashed] for hashed in sorted(sources) if hashed in index}
+    index_written = write_if_changed(index_path, json.dumps(index, indent=2, sort_keys=True) + '\n')
+
+    files_written = 0
+    for file_path, data in data_by_file.items():
+        changed = False
+        for question in data:
+            hashed = renames.get(question.get('image'))
+            if hashed and hashed != question['image']:
+                question['image'] = hashed
+                changed = True
+        if changed and write_if_changed(file_path, encode_questions(data, compact)):
+            files_written += 1
+            print(f"\n✅ Updated image fields in {file_path.name}")
+
+    referenced_bytes = sum((image_dir / name).stat().st_size for name in renames)
+    unique_bytes = sum(source.stat().st_size for source in sources.values())
+
+    # Everything in the image directory the data no longer needs
+    kept: Set[str] = set(sources)
+    for hashed, entry in index.items():
+        kept.update(variant_name(hashed, w, image_format) for image_format, ws in entry["variants"].items() for w in ws)
+    orphans = sorted(f for f in image_dir.iterdir() if f.is_file() and f.name not in kept)
+
+    if missing:
+        print(f"\nMissing images:")
+        for name in missing:
+            print(f"  ❌ {name}, used by: {', '.join(references[name])}")
+    if orphans:
+        print(f"\nOrphaned files{'' if remove_orphans else ' (use --remove-orphans to delete them)'}:")
+        for orphan in orphans:
+            if remove_orphans:
+                orphan.unlink()
+                print(f"  🗑️  {orphan.name}")
+            else:
+                print(f"  ⚪ {orphan.name}")
+
+    print(f"\n{'='*50}")
+    print(f"SUMMARY:")
+    print(f"Image references: {sum(map(len, references.values()))}")
+    print(f"Distinct images: {len(sources)} ({len(renames)} file name(s), {referenced_bytes:,} → {unique_bytes:,} bytes)")
+    print(f"Images encoded: {encoded} ({len(sources) - len(pending)} unchanged, formats: {', '.join(formats) or 'none'})")
+    print(f"Question files updated: {files_written}")
+    print(f"Variant index {'updated' if index_written else 'unchanged'}: {index_path}")
+    print(f"Missing images: {len(missing)}")
+    print(f"Orphaned files: {len(orphans)}{' (removed)' if remove_orphans and orphans else ''}")
+    print(f"{'='*50}")
+
+def main():
+    """Main function to optimize the images used by ../src/data"""
+    script_dir = Path(__file__).parent.absolute()
+    data_dir = (script_dir / ".." / "src" / "data").resolve()
+    image_dir = (script_dir / ".." / "public" / "test").resolve()
+
+    parser = argparse.ArgumentParser(
+        description="Deduplicate, re-encode (WebP/AVIF) and content-address the images used by the test data"
+    )
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="number of images to encode in parallel (0 = one per CPU, default: 1)")
+    parser.add_argument('--widths', type=int, nargs='+', default=DEFAULT_WIDTHS,
+                        help="variant widths in pixels (default: %(default)s)")
+    parser.add_argument('--compact', action='store_true',
+                        help="write minified JSON without empty optional fields")
+    parser.add_argument('--remove-orphans', action='store_true',
+                        help="delete files in public/test that no question uses any more")
+    args = parser.parse_args()
+
+    print(f"Optimizing the images of all test files in: {data_dir}")
+    optimize_images(data_dir, image_dir, data_dir / "images" / INDEX_NAME, sorted(args.widths),
+                    args.jobs, args.compact, args.remove_orphans)
+
+if __name__ == "__main__":
+    main()
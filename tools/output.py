@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+
+import filecmp
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Union
+
+# Fields every question keeps, even in the compact profile
+REQUIRED_FIELDS = ('id', 'question', 'options', 'correctAnswer')
+
+def compact_question(question: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Drop optional fields that hold nothing (empty tags, missing image, ...),
+    the same ones Question.to_dict leaves out
+    """
+    return {
+        key: value for key, value in question.items()
+        if key in REQUIRED_FIELDS or value not in (None, '', [], {})
+    }
+
+def encode_questions(data: List[Dict[str, Any]], compact: bool = False) -> str:
+    """
+    Serialize question data. The default profile is the indented layout used
+    across src/data; the compact profile is minified without empty fields.
+    """
+    if compact:
+        return json.dumps([compact_question(q) for q in data], ensure_ascii=False, separators=(',', ':'))
+    return json.dumps(data, indent=2, ensure_ascii=False)
+
+def format_bytes_saved(before: int, after: int) -> str:
+    """Describe a size change for the SUMMARY blocks"""
+    saved = before - after
+    percentage = (saved / before) * 100 if before else 0.0
+    return f"{before:,} → {after:,} bytes ({saved:,} saved, {percentage:.1f}%)"
+
+def temp_path_for(path: Path) -> Path:
+    """Private temporary file next to path, so os.replace stays on one file system"""
+    return path.with_name(f"{path.name}.{os.getpid()}.tmp")
+
+def write_if_changed(path: Path, content: Union[str, bytes]) -> bool:
+    """
+    Write content (text, stored as UTF-8, or bytes) to path unless it already
+    holds exactly those bytes, leaving its mtime alone (and Vite/HMR caches
+    valid) when nothing changed. The new content is written to a temporary file
+    that atomically replaces path, so a crash never leaves a truncated file behind.
+    Returns True if the file was written.
+    """
+    data = content.encode('utf-8') if isinstance(content, str) else content
+    try:
+        if path.stat().st_size == len(data) and path.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        pass
+    
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = temp_path_for(path)
+    try:
+        temp_path.write_bytes(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    return True
+
+class AtomicFile:
+    """
+    Context manager for streaming text into path with the guarantees of
+    write_if_changed: the text goes to a temporary file, which replaces path
+    only if the block succeeds and the bytes differ. `written` tells which
+    happened once the block is done.
+    """
+    
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.temp_path = temp_path_for(self.path)
+        self.written = False
+    
+    def __enter__(self):
+        self.file = open(self.temp_path, 'w', encoding='utf-8', newline='\n')
+        return self.file
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.file.close()
+        try:
+            if exc_type is None and not (self.path.exists() and filecmp.cmp(self.temp_path, self.path, shallow=False)):
+                os.replace(self.temp_path, self.path)
+                self.written = True
+        finally:
+            self.temp_path.unlink(missing_ok=True)
+        return False
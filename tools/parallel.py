@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Any, Callable, Iterator, List, Tuple
+
+import profiling
+
+def resolve_jobs(jobs: int) -> int:
+    """
+    Turn a --jobs value into a worker count (0 or less means one per CPU)
+    """
+    if jobs < 1:
+        return os.cpu_count() or 1
+    return jobs
+
+def _run_captured(func: Callable[[Path], Any], file_path: Path, profile: bool = False) -> Tuple[Any, str, Any]:
+    """
+    Run func in a worker process, capturing what it prints so the parent
+    can replay it in file order. With `profile`, the spans it records are
+    returned too so the parent can merge them.
+    """
+    if profile:
+        profiling.enable()
+    buffer = io.StringIO()
+    with redirect_stdout(buffer):
+        result = func(file_path)
+    return result, buffer.getvalue(), profiling.snapshot()
+
+def map_files(func: Callable[[Path], Any], files: List[Path], jobs: int = 1,
+              header: str = "Processing") -> Iterator[Tuple[Path, Any]]:
+    """
+    Apply func to every file and yield (file_path, result) in file order.
+
+    With jobs == 1 the files are processed serially in this process. Otherwise
+    they are spread over a process pool; each worker's console output is
+    buffered and printed in file order, so the log is the same as a serial run.
+    func must be picklable (a module-level function or a functools.partial).
+    """
+    jobs = min(resolve_jobs(jobs), max(len(files), 1))
+
+    if jobs == 1:
+        for file_path in files:
+            print(f"\n{header}: {file_path.name}")
+            yield file_path, func(file_path)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        profile = profiling.is_enabled()
+        futures = [executor.submit(_run_captured, func, file_path, profile) for file_path in files]
+        for file_path, future in zip(files, futures):
+            result, output, spans = future.result()
+            profiling.merge(spans)
+            print(f"\n{header}: {file_path.name}")
+            print(output, end='')
+            yield file_path, result
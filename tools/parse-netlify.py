@@ -1,29 +1,65 @@
+import argparse
 import json
 import re
-import sys
+from collections import deque
+from functools import partial
 from pathlib import Path
 
-def parse_quiz_data(text):
+import profiling
+from output import AtomicFile, compact_question
+from parallel import map_files
+
+ANSWER_LINES = ['1', '2', '3', '4']
+
+class LineWindow:
     """
-    Parse quiz data from the given text format into a list of question dictionaries.
+    Iterator over the stripped, non-empty lines of an input with a bounded
+    lookahead, so the parser never needs the whole input in memory
     """
-    lines = [line.strip() for line in text.strip().split('\n') if line.strip()]
-    questions = []
-    i = 0
+    
+    def __init__(self, lines, size=2):
+        self.lines = (line.strip() for line in lines)
+        self.size = size
+        self.buffer = deque()
+        self._fill()
+    
+    def _fill(self):
+        while len(self.buffer) < self.size:
+            for line in self.lines:
+                if line:
+                    self.buffer.append(line)
+                    break
+            else:
+                return
+    
+    def peek(self, offset=0):
+        """Return the line `offset` positions ahead, or None past the end"""
+        return self.buffer[offset] if offset < len(self.buffer) else None
+    
+    def advance(self):
+        """Consume and return the current line"""
+        line = self.buffer.popleft()
+        self._fill()
+        return line
+
+def is_answer_line(line):
+    return line is not None and line.isdigit() and line in ANSWER_LINES
+
+def iter_quiz_questions(lines):
+    """
+    Parse quiz data from an iterable of lines (e.g. an open file), yielding
+    question dictionaries one at a time.
+    """
+    window = LineWindow(lines)
     question_id = 1
     
-    while i < len(lines):
+    while window.peek() is not None:
         # First line is always the question
-        if i < len(lines):
-            question_text = lines[i]
-            i += 1
-        else:
-            break
+        question_text = window.advance()
             
         # Second line is always the answer index (1-4)
-        if i < len(lines) and lines[i].isdigit() and lines[i] in ['1', '2', '3', '4']:
-            answer_num = int(lines[i]) - 1
-            i += 1
+        if is_answer_line(window.peek()):
+            answer_num = int(window.advance()) - 1
         else:
             # Skip this question if no valid answer found
             continue
@@ -32,15 +68,12 @@ def parse_quiz_data(text):
         options = []
         option_count = 0
         
-        while i < len(lines) and option_count < 4:
-            option_line = lines[i]
+        while window.peek() is not None and option_count < 4:
+            option_line = window.peek()
             
             # Stop if we hit a line that looks like a new question
             # (but only if we already have at least 2 options)
-            if option_count >= 2 and (
-                (i + 1 < len(lines) and lines[i + 1].isdigit() and lines[i + 1] in ['1', '2', '3', '4']) or
-                option_line.endswith(':')
-            ):
+            if option_count >= 2 and (is_answer_line(window.peek(1)) or option_line.endswith(':')):
                 break
             
             # Clean up the option
@@ -52,7 +85,7 @@ def parse_quiz_data(text):
             if cleaned_option.endswith(' REVISADA'):
                 cleaned_option = cleaned_option.replace(' REVISADA', '').strip()
             if cleaned_option == 'NO MARCAR' or cleaned_option == 'REVISADA':
-                i += 1
+                window.advance()
                 continue
             
             # Remove "- " from beginning of options only
@@ -62,69 +95,260 @@ def parse_quiz_data(text):
                 options.append(cleaned_option)
                 option_count += 1
             
-            i += 1
+            window.advance()
         
         # Only add if we have a complete question with at least 2 options
         if len(options) >= 2:
-            questions.append({
+            yield {
                 'id': question_id,
                 'question': question_text,
                 'options': options[:4],  # Take only first 4 options
                 'correctAnswer': answer_num
-            })
+            }
             question_id += 1
-    
-    return questions
 
-def main():
-    script_dir = Path(__file__).parent.absolute()
-    data_dir = script_dir / ".." / "src" / "data"
-    
-    if len(sys.argv) < 2:
-        print("Usage: python parse-netlify.py <input_filename>")
-        return
+def parse_quiz_data(text):
+    """
+    Parse quiz data from the given text format into a list of question dictionaries.
+    """
+    return list(iter_quiz_questions(text.split('\n')))
 
-    input_filename = sys.argv[1]
-    name = data_dir / input_filename
-    output_filename = input_filename.rsplit('.', 1)[0] + '.json'
-    output_path = data_dir / output_filename
+class JsonArrayWriter:
+    """
+    Write a JSON array one item at a time, producing exactly the same text as
+    json.dump(items, file, indent=2, ensure_ascii=False), or with `compact` the
+    minified array without empty optional fields.
+    In compact mode it also tracks how many bytes that saved over the indented layout.
+    """
+    
+    def __init__(self, file, compact=False):
+        self.file = file
+        self.compact = compact
+        self.count = 0
+        self.bytes_written = 0
+        self.indented_bytes = 0
+    
+    def _emit(self, text):
+        self.file.write(text)
+        self.bytes_written += len(text.encode('utf-8'))
     
-    # Read the input file
-    content = None
+    def write(self, item):
+        with profiling.span('encode'):
+            indented = json.dumps(item, indent=2, ensure_ascii=False)
+            if self.compact:
+                self.indented_bytes += len(indented.encode('utf-8')) + len(indented.split('\n')) * 2 + 2
+                encoded = json.dumps(compact_question(item), ensure_ascii=False, separators=(',', ':'))
+        with profiling.span('write'):
+            if self.compact:
+                self._emit('[' if self.count == 0 else ',')
+                self._emit(encoded)
+            else:
+                self._emit('[\n  ' if self.count == 0 else ',\n  ')
+                self._emit(indented.replace('\n', '\n  '))
+        self.count += 1
+    
+    def close(self):
+        if self.compact:
+            self.indented_bytes += 2
+            self._emit('[]' if self.count == 0 else ']')
+        else:
+            self._emit('[]' if self.count == 0 else '\n]')
+    
+    @property
+    def bytes_saved(self):
+        return self.indented_bytes - self.bytes_written if self.compact else 0
+
+def stream_quiz_file(input_path, output_path, encoding, compact=False):
+    """
+    Parse a raw quiz dump line by line straight into a JSON file, which is
+    replaced atomically and only if its contents changed.
+    Returns the JsonArrayWriter used (question count, sizes) and the first question.
+    """
+    with open(input_path, 'r', encoding=encoding) as source, \
+            AtomicFile(output_path) as output:
+        writer = JsonArrayWriter(output, compact)
+        first_question = None
+        for question in iter_quiz_questions(source):
+            if first_question is None:
+                first_question = question
+            writer.write(question)
+        writer.close()
+    return writer, first_question
+
+def convert_quiz_file(input_path, output_path, compact=False):
+    """
+    Convert a raw quiz dump into a JSON file without holding all of it in memory.
+    Returns the JsonArrayWriter used (question count, sizes) and the first question.
+    """
+    with profiling.span('parse'):
+        try:
+            return stream_quiz_file(input_path, output_path, 'utf-8', compact)
+        except UnicodeDecodeError:
+            # Try with different encoding if UTF-8 fails
+            return stream_quiz_file(input_path, output_path, 'latin-1', compact)
+
+def read_quiz_file(path):
+    """
+    Read a raw quiz dump, falling back to Latin-1 when it is not valid UTF-8.
+    Raises FileNotFoundError if the file does not exist, returns None if it cannot be decoded.
+    """
     try:
-        with open(name, 'r', encoding='utf-8') as file:
-            content = file.read()
-    except FileNotFoundError:
-        print(f"File '{input_filename}' not found in {data_dir}.")
-        return
+        with open(path, 'r', encoding='utf-8') as file:
+            return file.read()
     except UnicodeDecodeError:
         # Try with different encoding if UTF-8 fails
         try:
-            with open(name, 'r', encoding='latin-1') as file:
-                content = file.read()
+            with open(path, 'r', encoding='latin-1') as file:
+                return file.read()
         except:
-            print("Could not read file with UTF-8 or Latin-1 encoding.")
-            return
+            return None
+
+MONTHS = ['enero', 'febrero', 'marzo', 'abril', 'mayo', 'junio', 'julio',
+          'agosto', 'septiembre', 'octubre', 'noviembre', 'diciembre']
+
+def source_tag(input_path):
+    """
+    Derive a tag such as "Junio 2024" (or just "2024") from a dump's file name,
+    matching the tags the front end filters by year. Returns None if the name
+    contains no year.
+    """
+    name = Path(input_path).stem.lower()
+    year = re.search(r'(?<!\d)(?:19|20)\d{2}(?!\d)', name)
+    if not year:
+        return None
     
-    # Parse the questions
-    questions = parse_quiz_data(content)
+    for month in MONTHS:
+        if month in name:
+            return f"{month.capitalize()} {year.group(0)}"
+    return year.group(0)
+
+def resolve_inputs(patterns, base_dir):
+    """
+    Expand input arguments relative to base_dir: plain file names, glob patterns
+    and directories (every non-JSON file inside). Returns unique paths in order.
+    """
+    inputs = []
+    for pattern in patterns:
+        path = base_dir / pattern
+        if any(char in pattern for char in '*?['):
+            matches = sorted(base_dir.glob(pattern))
+        elif path.is_dir():
+            matches = sorted(
+                f for f in path.iterdir()
+                if f.is_file() and f.suffix != '.json' and not f.name.startswith('.')
+            )
+        else:
+            matches = [path]
+        inputs.extend(m for m in matches if m.suffix != '.json')
+    return list(dict.fromkeys(inputs))
+
+def convert_input(input_path, compact=False):
+    """
+    Convert one raw dump into <name>.json next to it.
+    Returns (question_count, output_path, bytes_saved), or None on error.
+    """
+    output_path = input_path.with_suffix('.json')
     
-    print(f"Found {len(questions)} questions")
+    if not input_path.exists():
+        print(f"File '{input_path.name}' not found in {input_path.parent}.")
+        return None
     
-    # Save to output file
+    # Parse the questions straight into the output file
     try:
-        with open(output_path, 'w', encoding='utf-8') as file:
-            json.dump(questions, file, indent=2, ensure_ascii=False)
-        print(f"Formatted quiz saved to '{output_filename}'")
+        writer, _ = convert_quiz_file(input_path, output_path, compact)
     except Exception as e:
         print(f"Error saving JSON file: {e}")
-        return
+        return None
     
-    # Only print first question as preview if available
-    if questions:
-        print("\nPreview of first question:")
-        print("=" * 50)
-        print(json.dumps(questions[0], indent=2, ensure_ascii=False))
+    print(f"Found {writer.count} questions")
+    print(f"Formatted quiz saved to '{output_path.name}'")
+    if compact:
+        print(f"Compact output: {writer.bytes_written:,} bytes ({writer.bytes_saved:,} saved)")
+    return writer.count, output_path, writer.bytes_saved
+
+def write_merged(converted, merged_path, compact=False):
+    """
+    Concatenate converted files into one JSON file, numbering ids sequentially and
+    tagging every question with the tag derived from its source file name.
+    Returns the JsonArrayWriter used (question count, sizes).
+    """
+    with AtomicFile(merged_path) as output:
+        writer = JsonArrayWriter(output, compact)
+        for input_path, output_path in converted:
+            tag = source_tag(input_path)
+            with open(output_path, 'r', encoding='utf-8') as f:
+                questions = json.load(f)
+            for question in questions:
+                question['id'] = writer.count + 1
+                question['tags'] = [tag] if tag else []
+                writer.write(question)
+        writer.close()
+    return writer
+
+def main():
+    script_dir = Path(__file__).parent.absolute()
+    data_dir = script_dir / ".." / "src" / "data"
+    
+    parser = argparse.ArgumentParser(description="Convert raw quiz dumps in src/data into question JSON files")
+    parser.add_argument('inputs', nargs='+',
+                        help="file names, glob patterns or directories, relative to src/data")
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="number of files to convert in parallel (0 = one per CPU, default: 1)")
+    parser.add_argument('--merge', metavar='OUTPUT',
+                        help="also write all questions into OUTPUT (in src/data), tagged by source file name")
+    parser.add_argument('--compact', action='store_true',
+                        help="write minified JSON without empty optional fields")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    
+    with profiling.session(args):
+        inputs = resolve_inputs(args.inputs, data_dir)
+        if not inputs:
+            print(f"No input files matched in {data_dir}.")
+            return
+        
+        if len(inputs) == 1 and not args.merge:
+            # Single file: keep the classic output with a preview of the first question
+            result = convert_input(inputs[0], args.compact)
+            if result and result[0] > 0:
+                with open(result[1], 'r', encoding='utf-8') as f:
+                    first_question = json.load(f)[0]
+                print("\nPreview of first question:")
+                print("=" * 50)
+                print(json.dumps(first_question, indent=2, ensure_ascii=False))
+            return
+        
+        print(f"Converting {len(inputs)} files in: {data_dir.resolve()}")
+        
+        converted = []
+        total_questions = 0
+        bytes_saved = {}
+        convert = partial(convert_input, compact=args.compact)
+        for input_path, result in map_files(convert, inputs, args.jobs, header="Converting"):
+            if result is None:
+                continue
+            count, output_path, saved = result
+            converted.append((input_path, output_path))
+            total_questions += count
+            bytes_saved[output_path.name] = saved
+        
+        merged = None
+        if args.merge and converted:
+            merged = write_merged(converted, data_dir / args.merge, args.compact)
+            bytes_saved[args.merge] = merged.bytes_saved
+        
+        print(f"\n{'='*50}")
+        print(f"SUMMARY:")
+        print(f"Files converted: {len(converted)}/{len(inputs)}")
+        print(f"Total questions: {total_questions}")
+        if merged is not None:
+            print(f"Merged {merged.count} questions into '{args.merge}'")
+        if args.compact:
+            print(f"Bytes saved by compact output:")
+            for file_name, saved in bytes_saved.items():
+                print(f"  {file_name}: {saved:,}")
+            print(f"  Total: {sum(bytes_saved.values()):,}")
+        print(f"{'='*50}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
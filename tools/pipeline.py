@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+
+import argparse
+import importlib
+import json
+import time
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import deduplicator
+import format_code_blocks
+import profiling
+from manifest import Manifest, list_data_files
+from output import encode_questions, format_bytes_saved, write_if_changed
+from parallel import map_files
+from watch import DirectoryWatcher
+
+parse_netlify = importlib.import_module('parse-netlify')
+
+# Order in which stage timings are reported
+STAGES = ['read', 'decode', 'parse', 'format', 'dedupe', 'encode', 'write']
+
+class StageTimer:
+    """Accumulates wall-clock time per pipeline stage (also recorded as a profiling span)"""
+
+    def __init__(self):
+        self.totals: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            with profiling.span(name):
+                yield
+        finally:
+            self.totals[name] = self.totals.get(name, 0.0) + time.perf_counter() - start
+
+    def merge(self, totals: Dict[str, float]) -> None:
+        for name, seconds in totals.items():
+            self.totals[name] = self.totals.get(name, 0.0) + seconds
+
+def format_stage(data: List[Dict[str, Any]], cache: Optional[format_code_blocks.FormatCache]) -> Tuple[int, int]:
+    """
+    Format the ```cpp blocks of every question in place and update their render hints.
+    Returns (blocks_changed, questions_with_changed_hints).
+    """
+    return format_code_blocks.format_questions(data, cache)
+
+def dedupe_stage(data: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int, int]:
+    """
+    Merge duplicate questions and assign content ids. The data is only rebuilt when
+    something was merged or an id changed, so other files keep their exact fields.
+    Returns (data, num_removed, ids_assigned).
+    """
+    questions = deduplicator.TestParser.parse_json(data)
+    unique_questions, num_removed = deduplicator.TestDeduplicator.remove_duplicates(questions)
+    unique_questions, ids_assigned = deduplicator.TestDeduplicator.assign_content_ids(unique_questions)
+    if num_removed == 0 and ids_assigned == 0:
+        return data, 0, 0
+    return [q.to_dict() for q in unique_questions], num_removed, ids_assigned
+
+def run_stages(data: List[Dict[str, Any]], timer: StageTimer,
+               cache: Optional[format_code_blocks.FormatCache]) -> Tuple[List[Dict[str, Any]], int, int, int, int]:
+    """
+    Apply the in-memory stages (format, then dedupe) to decoded question data.
+    Returns (data, blocks_formatted, hints_changed, duplicates_removed, ids_assigned).
+    """
+    with timer.stage('format'):
+        blocks_formatted, hints_changed = format_stage(data, cache)
+    with timer.stage('dedupe'):
+        data, num_removed, ids_assigned = dedupe_stage(data)
+    return data, blocks_formatted, hints_changed, num_removed, ids_assigned
+
+def encode_json(data: List[Dict[str, Any]], timer: StageTimer, compact: bool = False) -> str:
+    """Encode question data in the same layout as the other tools"""
+    with timer.stage('encode'):
+        return encode_questions(data, compact)
+
+def write_json(output_path: Path, output: str, timer: StageTimer) -> bool:
+    """Write encoded question data unless the file already holds it. Returns True if written."""
+    with timer.stage('write'):
+        return write_if_changed(output_path, output)
+
+def process_json_file(file_path: Path, cache: Optional[format_code_blocks.FormatCache] = None,
+                      compact: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Run an existing question file through format and dedupe with a single read,
+    writing it back only if one of the stages changed it (or, with compact, if
+    it is not already in the compact layout).
+    Returns the per-file counts, bytes saved and stage timings, or None on error.
+    """
+    timer = StageTimer()
+    try:
+        with timer.stage('read'):
+            raw = file_path.read_text(encoding='utf-8')
+        with timer.stage('decode'):
+            data = json.loads(raw)
+
+        if not isinstance(data, list):
+            print(f"  ❌ Error: {file_path.name} is not a list of questions.")
+            return None
+
+        original_count = len(data)
+        data, blocks_formatted, hints_changed, num_removed, ids_assigned = run_stages(data, timer, cache)
+
+        bytes_saved = 0
+        written = False
+        if blocks_formatted > 0 or hints_changed > 0 or num_removed > 0 or ids_assigned > 0 or compact:
+            output = encode_json(data, timer, compact)
+            written = write_json(file_path, output, timer)
+        if written:
+            print(f"  ✅ Formatted {blocks_formatted} C++ block(s), merged {num_removed} duplicate(s): "
+                  f"{original_count} → {len(data)}")
+            if ids_assigned > 0:
+                print(f"  🔑 Assigned {ids_assigned} content id(s)")
+            if compact:
+                bytes_saved = len(raw.encode('utf-8')) - len(output.encode('utf-8'))
+                print(f"  📦 Compact output: {format_bytes_saved(len(raw.encode('utf-8')), len(output.encode('utf-8')))}")
+        else:
+            print(f"  ⚪ Unchanged ({original_count} questions)")
+        renderers = format_code_blocks.count_renderers(data)
+        print(f"  🎨 Needs {format_code_blocks.format_renderers(renderers, len(data))}")
+
+    except json.JSONDecodeError as e:
+        print(f"  ❌ Error decoding JSON in {file_path.name}: {e}")
+        return None
+    except Exception as e:
+        print(f"  ❌ Error processing {file_path.name}: {e}")
+        return None
+
+    return {
+        "original_count": original_count,
+        "final_count": len(data),
+        "blocks_formatted": blocks_formatted,
+        "written": written,
+        "bytes_saved": bytes_saved,
+        "renderers": renderers,
+        "timings": timer.totals,
+    }
+
+def process_raw_file(input_path: Path, cache: Optional[format_code_blocks.FormatCache] = None,
+                     compact: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Convert a raw quiz dump into <name>.json next to it, running parse, format and
+    dedupe in memory. The output is only written if it differs from the existing file.
+    Returns the per-file counts, bytes saved and stage timings, or None on error.
+    """
+    timer = StageTimer()
+    output_path = input_path.with_suffix('.json')
+    try:
+        with timer.stage('read'):
+            content = parse_netlify.read_quiz_file(input_path)
+        if content is None:
+            print(f"  ❌ Could not read {input_path.name} with UTF-8 or Latin-1 encoding.")
+            return None
+
+        with timer.stage('parse'):
+            data = parse_netlify.parse_quiz_data(content)
+
+        original_count = len(data)
+        data, blocks_formatted, _, num_removed, _ = run_stages(data, timer, cache)
+
+        existing_raw = None
+        existing = None
+        if output_path.exists():
+            with timer.stage('read'):
+                existing_raw = output_path.read_text(encoding='utf-8')
+            with timer.stage('decode'):
+                try:
+                    existing = json.loads(existing_raw)
+                except json.JSONDecodeError:
+                    existing = None
+
+        bytes_saved = 0
+        if compact:
+            output = encode_json(data, timer, compact)
+            written = output != existing_raw
+        else:
+            written = existing != data
+            if written:
+                output = encode_json(data, timer)
+        if written:
+            # write_json also skips the write when the bytes on disk already match
+            written = write_json(output_path, output, timer)
+        if written:
+            if compact:
+                bytes_saved = len(encode_json(data, timer).encode('utf-8')) - len(output.encode('utf-8'))
+            print(f"  ✅ {original_count} question(s) parsed, {blocks_formatted} C++ block(s) formatted, "
+                  f"{num_removed} duplicate(s) merged → {output_path.name}")
+        else:
+            print(f"  ⚪ {output_path.name} is already up to date ({len(data)} questions)")
+        renderers = format_code_blocks.count_renderers(data)
+        print(f"  🎨 Needs {format_code_blocks.format_renderers(renderers, len(data))}")
+
+    except FileNotFoundError:
+        print(f"  ❌ File '{input_path.name}' not found.")
+        return None
+    except Exception as e:
+        print(f"  ❌ Error processing {input_path.name}: {e}")
+        return None
+
+    return {
+        "original_count": original_count,
+        "final_count": len(data),
+        "blocks_formatted": blocks_formatted,
+        "written": written,
+        "bytes_saved": bytes_saved,
+        "renderers": renderers,
+        "timings": timer.totals,
+    }
+
+def tool_version(compact: bool = False) -> str:
+    """Manifest version: changes whenever one of the chained tools (or the output profile) changes"""
+    version = f"{deduplicator.TOOL_VERSION}+{format_code_blocks.tool_version()}"
+    return f"{version}+compact" if compact else version
+
+def run_pipeline(files: List[Path], worker, jobs: int = 1, manifest: Optional[Manifest] = None) -> None:
+    """Run a per-file pipeline worker over files and print the SUMMARY with stage timings"""
+    timer = StageTimer()
+    total_original = 0
+    total_final = 0
+    total_blocks = 0
+    written_files = 0
+    processed_files = 0
+    bytes_saved: Dict[str, int] = {}
+    renderers: Dict[str, Dict[str, int]] = {}
+
+    for file_path, result in map_files(worker, files, jobs):
+        if result is None:
+            continue
+
+        if manifest is not None:
+            manifest.record(file_path)
+        processed_files += 1
+        total_original += result["original_count"]
+        total_final += result["final_count"]
+        total_blocks += result["blocks_formatted"]
+        written_files += result["written"]
+        if result["bytes_saved"]:
+            bytes_saved[file_path.name] = result["bytes_saved"]
+        renderers[file_path.name] = result["renderers"]
+        timer.merge(result["timings"])
+
+    print(f"\n{'='*50}")
+    print(f"SUMMARY:")
+    print(f"Files processed: {processed_files}/{len(files)}")
+    print(f"Files written: {written_files}")
+    print(f"Total questions: {total_original} → {total_final}")
+    print(f"Total C++ blocks formatted: {total_blocks}")
+    print(f"Total duplicates merged: {total_original - total_final}")
+    if renderers:
+        print(f"Questions needing each renderer:")
+        for name, counts in renderers.items():
+            print(f"  {name}: KaTeX {counts['KaTeX']}, highlight.js {counts['highlight.js']}, images {counts['images']}")
+    if bytes_saved:
+        print(f"Bytes saved by compact output:")
+        for name, saved in bytes_saved.items():
+            print(f"  {name}: {saved:,}")
+        print(f"  Total: {sum(bytes_saved.values()):,}")
+    print(f"Stage timings:")
+    for name in STAGES:
+        if name in timer.totals:
+            print(f"  {name:<8} {timer.totals[name] * 1000:9.1f} ms")
+    print(f"{'='*50}")
+
+def watch_data(data_dir: Path, manifest: Manifest, cache: Optional[format_code_blocks.FormatCache] = None,
+               compact: bool = False, interval: float = 0.5) -> None:
+    """
+    Re-run format and dedupe on each data file as soon as it changes, until interrupted.
+    Only the changed file is read and processed. Files the pipeline writes itself
+    (or that are touched without changing) match the manifest and are skipped,
+    so the watcher never loops on its own output.
+    """
+    watcher = DirectoryWatcher(data_dir, interval)
+    print(f"\nWatching {data_dir} for changes (Ctrl+C to stop)...")
+
+    try:
+        for changed, removed in watcher.watch():
+            for file_path in removed:
+                print(f"\n🗑️  {file_path.name} removed")
+
+            for file_path in changed:
+                if manifest.is_unchanged(file_path):
+                    watcher.acknowledge(file_path)
+                    continue
+
+                print(f"\nProcessing: {file_path.name}")
+                result = process_json_file(file_path, cache, compact)
+                watcher.acknowledge(file_path)
+                if result is not None:
+                    manifest.record(file_path)
+                    print(f"  ⏱️  {sum(result['timings'].values()) * 1000:.1f} ms")
+
+            manifest.prune(watcher.states)
+            manifest.save()
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+
+def main():
+    """Main function to run the data pipeline over ../src/data"""
+    parser = argparse.ArgumentParser(
+        description="Format and deduplicate the test data files in one pass, optionally converting raw quiz dumps first"
+    )
+    parser.add_argument('inputs', nargs='*',
+                        help="raw quiz dumps in src/data to convert (default: process the existing JSON files)")
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="number of files to process in parallel (0 = one per CPU, default: 1)")
+    parser.add_argument('--force', action='store_true',
+                        help="reprocess every JSON file, even those unchanged since the last run")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="always run clang-format instead of reusing cached results")
+    parser.add_argument('--compact', action='store_true',
+                        help="write minified JSON without empty optional fields")
+    parser.add_argument('--watch', action='store_true',
+                        help="after the run, keep watching src/data and reprocess each file when it changes")
+    parser.add_argument('--interval', type=float, default=0.5,
+                        help="seconds between --watch polls (default: %(default)s)")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.watch and args.inputs:
+        parser.error("--watch only works on the existing JSON files, not with raw inputs")
+
+    script_dir = Path(__file__).parent.absolute()
+    data_dir = (script_dir / ".." / "src" / "data").resolve()
+    cache = None if args.no_cache else format_code_blocks.FormatCache()
+
+    with profiling.session(args):
+        if args.inputs:
+            files = [data_dir / name for name in args.inputs]
+            print(f"Converting {len(files)} raw file(s) in: {data_dir}")
+            run_pipeline(files, partial(process_raw_file, cache=cache, compact=args.compact), args.jobs)
+        else:
+            files = list_data_files(data_dir)
+            manifest = Manifest(data_dir, "pipeline", tool_version(args.compact))
+            pending = files if args.force else [f for f in files if not manifest.is_unchanged(f)]
+            print(f"Processing all test files in: {data_dir}")
+            if len(pending) < len(files):
+                print(f"Skipping {len(files) - len(pending)} unchanged file(s) (use --force to reprocess them)")
+            run_pipeline(pending, partial(process_json_file, cache=cache, compact=args.compact), args.jobs, manifest)
+            manifest.prune(files)
+            manifest.save()
+            if args.watch:
+                watch_data(data_dir, manifest, cache, args.compact, args.interval)
+
+    if cache is not None:
+        cache.evict()
+
+if __name__ == "__main__":
+    main()
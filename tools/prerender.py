@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+
+import argparse
+import hashlib
+import json
+import re
+import shutil
+import subprocess
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pyversion  # exits on Python < 3.10, before the imports that need it
+from format_code_blocks import (
+    CODE_BLOCK_REGEX, DEFAULT_CACHE_SIZE, LATEX_DISPLAY_REGEX, LATEX_INLINE_REGEX, FormatCache
+)
+from manifest import list_data_files
+from output import write_if_changed
+
+SCRIPT_DIR = Path(__file__).parent.absolute()
+PROJECT_DIR = SCRIPT_DIR.parent
+RENDERER_SCRIPT = SCRIPT_DIR / 'render-fragments.mjs'
+
+DEFAULT_CACHE_DIR = SCRIPT_DIR / '.cache' / 'render'
+
+# Maximum number of fragments sent to the renderer in one request
+BATCH_SIZE = 500
+
+# The last replacement of TextRenderer.vue, after math and code blocks
+INLINE_CODE_REGEX = re.compile(r'`([^`]+)`')
+
+# The rendered replacements of TextRenderer.vue, in its order: (regex, fragment
+# kind, display mode). Each step runs over the output of the previous ones,
+# exactly as in the browser.
+RENDER_STEPS = [
+    (LATEX_DISPLAY_REGEX, 'math', True),
+    (LATEX_INLINE_REGEX, 'math', False),
+    (CODE_BLOCK_REGEX, 'code', False),
+]
+
+# Stands in for a rendered fragment until its HTML is known; it holds no
+# character any of the regexes above look for
+PLACEHOLDER = '\x00{}\x00'
+PLACEHOLDER_REGEX = re.compile('\x00(\\d+)\x00')
+
+HTML_ESCAPES = [('&', '&amp;'), ('<', '&lt;'), ('>', '&gt;'), ('"', '&quot;'), ("'", '&#39;')]
+
+# (kind, source, display)
+Fragment = Tuple[str, str, bool]
+
+def escape_html(text: str) -> str:
+    for char, entity in HTML_ESCAPES:
+        text = text.replace(char, entity)
+    return text
+
+def deescape_html(text: str) -> str:
+    """Undo escape_html the way TextRenderer.vue does (&amp; first, like its chain of replaces)"""
+    for char, entity in HTML_ESCAPES:
+        text = text.replace(entity, char)
+    return text
+
+def needs_rendering(text: str) -> bool:
+    """Whether TextRenderer would call KaTeX or highlight.js for this text"""
+    escaped = escape_html(text)
+    return any(regex.search(escaped) for regex, _, _ in RENDER_STEPS)
+
+@lru_cache(maxsize=None)
+def renderer_fingerprint() -> str:
+    """
+    Describe the renderer setup (KaTeX and highlight.js versions, renderer script)
+    so cached fragments are re-rendered whenever one of them changes
+    """
+    versions = []
+    for package in ('katex', 'highlight.js'):
+        try:
+            with open(PROJECT_DIR / 'node_modules' / package / 'package.json', 'r', encoding='utf-8') as f:
+                versions.append(f"{package}@{json.load(f)['version']}")
+        except (OSError, ValueError, KeyError):
+            versions.append(f"{package}@unknown")
+    script = hashlib.sha256(RENDERER_SCRIPT.read_bytes()).hexdigest()[:12]
+    return f"{' '.join(versions)} {script}"
+
+class RenderCache(FormatCache):
+    """FormatCache keyed by the renderer setup instead of the clang-format one"""
+
+    def _entry_path(self, key):
+        digest = hashlib.sha256(f"{renderer_fingerprint()}\0{key}".encode('utf-8')).hexdigest()
+        return self.cache_dir / digest[:2] / digest
+
+def fragment_key(fragment: Fragment) -> str:
+    kind, source, display = fragment
+    return f"{kind}\0{int(display)}\0{source}"
+
+class FragmentRenderer:
+    """
+    One long-lived `bun`/`node` process running render-fragments.mjs, started
+    on first use. Fragments are sent in batches of BATCH_SIZE over stdin/stdout.
+    """
+
+    def __init__(self):
+        self.process: Optional[subprocess.Popen] = None
+        self.versions: Dict[str, str] = {}
+        self.requests = 0
+
+    def start(self) -> None:
+        runtime = shutil.which('bun') or shutil.which('node')
+        if runtime is None:
+            raise RuntimeError("neither bun nor node was found in PATH")
+
+        self.process = subprocess.Popen(
+            [runtime, str(RENDERER_SCRIPT)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            encoding='utf-8',
+            cwd=PROJECT_DIR,
+        )
+        hello = self.process.stdout.readline()
+        if not hello:
+            self.close()
+            raise RuntimeError("the renderer exited on startup (are the npm dependencies installed?)")
+        self.versions = json.loads(hello)
+
+    def render(self, fragments: List[Fragment]) -> List[str]:
+        """Render fragments in order. Returns the HTML of each one."""
+        if self.process is None:
+            self.start()
+
+        html = []
+        for start in range(0, len(fragments), BATCH_SIZE):
+            batch = [
+                {"kind": kind, "source": source, "display": display, "language": "cpp"}
+                for kind, source, display in fragments[start:start + BATCH_SIZE]
+            ]
+            self.process.stdin.write(json.dumps(batch, ensure_ascii=False) + '\n')
+            self.process.stdin.flush()
+            reply = self.process.stdout.readline()
+            self.requests += 1
+            if not reply:
+                raise RuntimeError("the renderer exited unexpectedly")
+            reply = json.loads(reply)
+            if 'error' in reply:
+                raise RuntimeError(f"the renderer failed: {reply['error']}")
+            html.extend(reply['html'])
+        return html
+
+    def close(self) -> None:
+        if self.process is not None:
+            self.process.stdin.close()
+            self.process.wait()
+            self.process = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+def render_fragments(fragments: Iterable[Fragment], renderer: FragmentRenderer,
+                     cache: Optional[RenderCache] = None) -> Dict[Fragment, str]:
+    """
+    Render every distinct fragment once: cached ones come from `cache`, the
+    others go to the renderer in batches and are added to the cache.
+    Returns a dict mapping each fragment to its HTML.
+    """
+    unique = list(dict.fromkeys(fragments))
+    rendered = {}
+
+    if cache is not None:
+        for fragment in unique:
+            html = cache.get(fragment_key(fragment))
+            if html is not None:
+                rendered[fragment] = html
+
+    missing = [fragment for fragment in unique if fragment not in rendered]
+    if missing:
+        for fragment, html in zip(missing, renderer.render(missing)):
+            rendered[fragment] = html
+            if cache is not None:
+                cache.put(fragment_key(fragment), html)
+
+    return rendered
+
+def prerender_texts(texts: Iterable[str], renderer: FragmentRenderer,
+                    cache: Optional[RenderCache] = None) -> Dict[str, str]:
+    """
+    Compute the HTML TextRenderer.vue would produce for every text that needs
+    KaTeX or highlight.js. Each render step is done for all texts at once, so
+    the whole corpus takes one renderer request per step and batch.
+    Returns a dict mapping each such text to its HTML.
+    """
+    states = {text: escape_html(text) for text in dict.fromkeys(texts) if needs_rendering(text)}
+
+    for regex, kind, display in RENDER_STEPS:
+        templates: Dict[str, Tuple[str, List[Fragment]]] = {}
+        for text, html in states.items():
+            fragments: List[Fragment] = []
+
+            def extract(match):
+                fragments.append((kind, deescape_html(match.group(1)), display))
+                return PLACEHOLDER.format(len(fragments) - 1)
+
+            templates[text] = (regex.sub(extract, html), fragments)
+
+        rendered = render_fragments(
+            (fragment for _, fragments in templates.values() for fragment in fragments), renderer, cache
+        )
+
+        for text, (template, fragments) in templates.items():
+            parts = [rendered[fragment] for fragment in fragments]
+            if kind == 'code':
+                parts = [f"<pre><code>{part}</code></pre>" for part in parts]
+            states[text] = PLACEHOLDER_REGEX.sub(lambda match: parts[int(match.group(1))], template)
+
+    return {text: INLINE_CODE_REGEX.sub(r'<code>\1</code>', html) for text, html in states.items()}
+
+def question_texts(questions: List[Dict[str, Any]]) -> List[str]:
+    """Every string TextRenderer shows for a file: question texts and options"""
+    texts = []
+    for question in questions:
+        texts.append(question.get('question') or '')
+        texts.extend(question.get('options') or [])
+    return texts
+
+def encode(data: Any) -> str:
+    """Deterministic compact JSON, so unchanged outputs keep the same bytes"""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+
+def prerender_shards(shards_dir: Path, output_dir: Path, html: Dict[str, str]) -> int:
+    """
+    Write <output_dir>/<test_id>/<year>.json for every year shard of shards_dir
+    (see shard_by_year.py), holding only the HTML of that shard's texts, so a
+    client that loads one year does not load the whole file's HTML. Every shard
+    text is also in its full file, so the HTML is already rendered.
+    Returns the number of outputs written.
+    """
+    shards = sorted(shards_dir.glob('*/*.json')) if shards_dir.exists() else []
+    written = 0
+    for shard_path in shards:
+        try:
+            with open(shard_path, 'r', encoding='utf-8') as f:
+                texts = [text for text in question_texts(json.load(f)) if text in html]
+        except Exception as e:
+            print(f"  ❌ Error reading shard {shard_path.parent.name}/{shard_path.name}: {e}")
+            continue
+        written += write_if_changed(output_dir / shard_path.parent.name / shard_path.name,
+                                    encode({text: html[text] for text in texts}))
+
+    for stale in sorted(output_dir.glob('*/*.json')) if output_dir.exists() else []:
+        if not (shards_dir / stale.parent.name / stale.name).exists():
+            stale.unlink()
+            if not any(stale.parent.iterdir()):
+                stale.parent.rmdir()
+
+    print(f"\nYear shards: {len(shards)} pre-rendered, {written} written")
+    return written
+
+def prerender_directory(data_dir: Path, output_dir: Path, cache: Optional[RenderCache] = None,
+                        shards_dir: Optional[Path] = None) -> bool:
+    """
+    Write <output_dir>/<test_id>.json for every question file of data_dir,
+    mapping each question or option text that needs KaTeX or highlight.js to
+    its HTML. Keying by the text itself means an edited text simply misses
+    and is rendered in the browser until the next build.
+    With shards_dir, the year shards get their own maps in <output_dir>/shards.
+    Returns False if rendering failed.
+    """
+    files = list_data_files(data_dir)
+    print(f"Found {len(files)} JSON files in '{data_dir}'")
+
+    texts_by_file: Dict[Path, List[str]] = {}
+    for file_path in files:
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                texts_by_file[file_path] = [text for text in question_texts(json.load(f)) if needs_rendering(text)]
+        except Exception as e:
+            print(f"  ❌ Error reading {file_path.name}: {e}")
+
+    with FragmentRenderer() as renderer:
+        try:
+            html = prerender_texts(
+                (text for texts in texts_by_file.values() for text in texts), renderer, cache
+            )
+        except (RuntimeError, OSError, ValueError) as e:
+            print(f"  ❌ Error rendering: {e}")
+            return False
+
+    written = 0
+    for file_path, texts in texts_by_file.items():
+        print(f"\nProcessing: {file_path.name}")
+        written_now = write_if_changed(output_dir / file_path.name, encode({text: html[text] for text in texts}))
+        written += written_now
+        if written_now:
+            print(f"  ✅ Pre-rendered {len(set(texts))} text(s)")
+        else:
+            print(f"  ⚪ Unchanged ({len(set(texts))} pre-rendered texts)")
+
+    for stale in sorted(output_dir.glob('*.json')) if output_dir.exists() else []:
+        if not (data_dir / stale.name).exists():
+            stale.unlink()
+            print(f"\n🗑️  Removed stale output {stale.name}")
+
+    if shards_dir is not None:
+        written += prerender_shards(shards_dir, output_dir / "shards", html)
+
+    print(f"\n{'='*50}")
+    print(f"SUMMARY:")
+    print(f"Files processed: {len(texts_by_file)}/{len(files)}")
+    print(f"Files written: {written}")
+    print(f"Texts pre-rendered: {len(html)}")
+    if cache is not None:
+        print(f"Fragment cache: {cache.hits} hit(s), {cache.misses} miss(es)")
+    print(f"Renderer requests: {renderer.requests}")
+    print(f"{'='*50}")
+    return True
+
+def main():
+    """Main function to pre-render ../src/data into ../src/data/rendered"""
+    data_dir = PROJECT_DIR / "src" / "data"
+
+    parser = argparse.ArgumentParser(
+        description="Pre-render the KaTeX math and highlight.js code of the test data at build time"
+    )
+    parser.add_argument('--output', type=Path, default=data_dir / "rendered",
+                        help="directory for the pre-rendered HTML (default: src/data/rendered)")
+    parser.add_argument('--shards', type=Path, default=data_dir / "shards",
+                        help="year shards to pre-render as well (default: src/data/shards)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="render every fragment instead of reusing cached results")
+    args = parser.parse_args()
+
+    cache = None if args.no_cache else RenderCache(DEFAULT_CACHE_DIR, DEFAULT_CACHE_SIZE)
+
+    print(f"Pre-rendering all test files in: {data_dir.resolve()}")
+    if not prerender_directory(data_dir, args.output, cache, args.shards):
+        sys.exit(1)
+
+    if cache is not None:
+        cache.evict()
+
+if __name__ == "__main__":
+    main()
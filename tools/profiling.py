@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+
+import cProfile
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Returned by span() while profiling is off: entering it does nothing
+_NULL_SPAN = nullcontext()
+
+_profiler: Optional['Profiler'] = None
+
+# Hot functions registered with instrument(): (owner, attribute, span name, original)
+_hooks: List[Tuple[Any, str, str, Any]] = []
+
+class Profiler:
+    """
+    Aggregated wall-clock time and call counts of named spans.
+    Spans may nest; `stacks` keeps the self time of every nesting path, which
+    is what flame graph tools expect.
+    """
+
+    def __init__(self):
+        self.totals: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.stacks: Dict[str, float] = {}
+        # Open spans, innermost last: [name, time spent in child spans]
+        self.open: List[List[Any]] = []
+
+    def record(self, name: str, elapsed: float) -> None:
+        frame = self.open.pop()
+        path = ';'.join([entry[0] for entry in self.open] + [name])
+        self.totals[name] = self.totals.get(name, 0.0) + elapsed
+        self.counts[name] = self.counts.get(name, 0) + 1
+        self.stacks[path] = self.stacks.get(path, 0.0) + elapsed - frame[1]
+        if self.open:
+            self.open[-1][1] += elapsed
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {"totals": self.totals, "counts": self.counts, "stacks": self.stacks}
+
+    def merge(self, snapshot: Dict[str, Dict[str, Any]]) -> None:
+        """Add the spans recorded by another process"""
+        for field in ('totals', 'counts', 'stacks'):
+            target = getattr(self, field)
+            for key, value in snapshot[field].items():
+                target[key] = target.get(key, 0) + value
+
+class _Span:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler: Profiler, name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler.open.append([self.name, 0.0])
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+
+def span(name: str):
+    """
+    Context manager timing the enclosed block as `name` while profiling is on.
+    While it is off this only costs a function call.
+    """
+    if _profiler is None:
+        return _NULL_SPAN
+    return _Span(_profiler, name)
+
+def _patch(owner: Any, attribute: str, name: str, original: Any) -> None:
+    func = original.__func__ if isinstance(original, staticmethod) else original
+
+    @wraps(func)
+    def timed(*args, **kwargs):
+        with _Span(_profiler, name):
+            return func(*args, **kwargs)
+
+    setattr(owner, attribute, staticmethod(timed) if isinstance(original, staticmethod) else timed)
+
+def instrument(owner: Any, attribute: str, name: str) -> None:
+    """
+    Time every call of a hot function (a module function or a class's method)
+    as span `name`. The function is only wrapped while profiling is on, so it
+    keeps its full speed otherwise.
+    """
+    original = vars(owner)[attribute]
+    _hooks.append((owner, attribute, name, original))
+    if _profiler is not None:
+        _patch(owner, attribute, name, original)
+
+def is_enabled() -> bool:
+    return _profiler is not None
+
+def enable() -> Profiler:
+    """Start recording spans with a fresh profiler and wrap the instrumented functions"""
+    global _profiler
+    if _profiler is None:
+        for owner, attribute, name, original in _hooks:
+            _patch(owner, attribute, name, original)
+    _profiler = Profiler()
+    return _profiler
+
+def disable() -> None:
+    """Stop recording and restore the instrumented functions"""
+    global _profiler
+    _profiler = None
+    for owner, attribute, _, original in _hooks:
+        setattr(owner, attribute, original)
+
+def snapshot() -> Optional[Dict[str, Dict[str, Any]]]:
+    return _profiler.snapshot() if _profiler is not None else None
+
+def merge(snapshot: Optional[Dict[str, Dict[str, Any]]]) -> None:
+    """Add spans recorded by a worker process to this process's profiler"""
+    if _profiler is not None and snapshot:
+        _profiler.merge(snapshot)
+
+def print_table(profiler: Profiler) -> None:
+    print(f"\n{'='*50}")
+    print(f"PROFILE:")
+    print(f"  {'span':<18} {'calls':>9} {'total ms':>11} {'mean µs':>10}")
+    for name, total in sorted(profiler.totals.items(), key=lambda item: -item[1]):
+        count = profiler.counts[name]
+        print(f"  {name:<18} {count:>9,} {total * 1000:>11.1f} {total / count * 1e6:>10.1f}")
+    print(f"Nested spans are included in their parents' totals")
+    print(f"{'='*50}")
+
+def write_collapsed(profiler: Profiler, path: Path) -> None:
+    """Write the span stacks in the collapsed format of flamegraph.pl and speedscope (self time in µs)"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for stack, seconds in sorted(profiler.stacks.items()):
+            microseconds = round(seconds * 1e6)
+            if microseconds > 0:
+                f.write(f"{stack} {microseconds}\n")
+
+def add_arguments(parser) -> None:
+    """Add the --profile options shared by the tools to an argparse parser"""
+    parser.add_argument('--profile', action='store_true',
+                        help="time the tool's stages and print a table of spans at the end")
+    parser.add_argument('--profile-stats', type=Path, metavar='PATH',
+                        help="also write a cProfile stats file (pstats) of this process to PATH")
+    parser.add_argument('--profile-collapsed', type=Path, metavar='PATH',
+                        help="also write the span stacks to PATH in flame graph collapsed format")
+
+@contextmanager
+def session(args):
+    """
+    Profile the enclosed block if the --profile options ask for it, then report.
+    Spans from --jobs worker processes are merged in; the cProfile stats only
+    cover this process.
+    """
+    if not (args.profile or args.profile_stats or args.profile_collapsed):
+        yield
+        return
+
+    profiler = enable()
+    stats = cProfile.Profile() if args.profile_stats else None
+    if stats is not None:
+        stats.enable()
+    try:
+        yield
+    finally:
+        if stats is not None:
+            stats.disable()
+            stats.dump_stats(args.profile_stats)
+        disable()
+        print_table(profiler)
+        if args.profile_stats:
+            print(f"cProfile stats written to: {args.profile_stats}")
+        if args.profile_collapsed:
+            write_collapsed(profiler, args.profile_collapsed)
+            print(f"Collapsed stacks written to: {args.profile_collapsed}")
@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+
+import sys
+
+# deduplicator.py uses @dataclass(slots=True), new in Python 3.10
+MIN_PYTHON = (3, 10)
+
+def check_python_version() -> None:
+    """
+    Exit with a clear message on an unsupported Python, instead of a TypeError
+    somewhere in an import. Runs when this module is imported, so the tools
+    import it before anything that needs a newer Python.
+    """
+    if sys.version_info < MIN_PYTHON:
+        required = '.'.join(map(str, MIN_PYTHON))
+        sys.exit(f"❌ The data tools need Python {required} or newer; "
+                 f"{sys.executable} is Python {sys.version.split()[0]}.")
+
+check_python_version()
@@ -0,0 +1,34 @@
+// Long-lived renderer for tools/prerender.py.
+// Prints one line with the library versions, then answers each JSON line read
+// from stdin (an array of fragments) with one JSON line (an array of HTML strings):
+//   {"kind": "math", "source": "...", "display": true}  -> katex.renderToString
+//   {"kind": "code", "source": "...", "language": "cpp"} -> hljs.highlight(...).value
+// The options match src/components/TextRenderer.vue.
+import { createInterface } from "node:readline"
+
+import hljs from "highlight.js/lib/common"
+import katex from "katex"
+
+function render(fragment) {
+  if (fragment.kind === "math") {
+    return katex.renderToString(fragment.source, {
+      displayMode: fragment.display,
+      throwOnError: false
+    })
+  }
+  return hljs.highlight(fragment.source, { language: fragment.language }).value
+}
+
+process.stdout.write(JSON.stringify({ katex: katex.version, highlight: hljs.versionString }) + "\n")
+
+const lines = createInterface({ input: process.stdin, crlfDelay: Infinity })
+
+for await (const line of lines) {
+  let reply
+  try {
+    reply = { html: JSON.parse(line).map(render) }
+  } catch (error) {
+    reply = { error: String(error) }
+  }
+  process.stdout.write(JSON.stringify(reply) + "\n")
+}
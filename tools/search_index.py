@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import re
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pyversion  # exits on Python < 3.10, before the imports that need it
+from manifest import Manifest, list_data_files
+from output import write_if_changed
+
+# Bump when tokenization or the cached per-file index changes
+TOOL_VERSION = "2"
+INDEX_FORMAT = 2
+
+META_NAME = 'meta.json'
+DEFAULT_SHARDS = 32
+
+# Runs of letters, numbers and underscores of the normalized text (for str
+# patterns, Python's \w is exactly [\p{L}\p{N}_]); shorter tokens are left out
+TOKEN_REGEX = re.compile(r'\w+')
+MIN_TOKEN_LENGTH = 2
+
+# The tokenization rule as published in meta.json, for clients to apply to queries
+CLIENT_TOKENIZER = {
+    "normalize": "NFKC",
+    "case": "toLowerCase",
+    "token": "[\\p{L}\\p{N}_]+",
+    "flags": "gu",
+}
+
+# Posting lists: term -> test id (file stem) -> question ids
+Postings = Dict[str, Dict[str, List[int]]]
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into search terms: NFKC, then lower() (the default Unicode
+    lowercase mapping, like JS toLowerCase(); casefold() would differ, e.g.
+    "ß" -> "ss"), then runs of \\w. A client gets the same terms for a query with
+    query.normalize("NFKC").toLowerCase().match(/[\\p{L}\\p{N}_]+/gu), keeping
+    tokens of at least MIN_TOKEN_LENGTH code points ([...token].length).
+    """
+    return [
+        token for token in TOKEN_REGEX.findall(unicodedata.normalize('NFKC', text).lower())
+        if len(token) >= MIN_TOKEN_LENGTH
+    ]
+
+def index_questions(questions: List[Dict[str, Any]]) -> Dict[str, List[int]]:
+    """Build the index of one question file: term -> sorted ids of the questions containing it"""
+    index: Dict[str, set] = {}
+    for question in questions:
+        question_id = question['id']
+        texts = [question.get('question') or ''] + list(question.get('options') or [])
+        for text in texts:
+            for term in tokenize(text):
+                index.setdefault(term, set()).add(question_id)
+    return {term: sorted(ids) for term, ids in sorted(index.items())}
+
+def shard_of(term: str, shards: int) -> int:
+    """Shard holding a term: 32-bit FNV-1a of its UTF-8 bytes, modulo the shard count"""
+    h = 0x811c9dc5
+    for byte in term.encode('utf-8'):
+        h = ((h ^ byte) * 0x01000193) & 0xffffffff
+    return h % shards
+
+def delta_encode(ids: List[int]) -> List[int]:
+    """[3, 7, 8, 20] -> [3, 4, 1, 12]: small gaps serialize in fewer digits than the ids"""
+    return [ids[0]] + [b - a for a, b in zip(ids, ids[1:])]
+
+def encode(data: Any) -> str:
+    """Deterministic compact JSON, so unchanged shards keep the same bytes"""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+
+def load_file_index(file_path: Path, cache_dir: Path, manifest: Manifest,
+                    force: bool = False) -> Optional[Dict[str, List[int]]]:
+    """
+    Return the index of one question file, re-tokenizing it only if it changed
+    since the last build. Returns None if the file can't be read.
+    """
+    cache_path = cache_dir / f'{file_path.stem}.json'
+    if not force and cache_path.exists() and manifest.is_unchanged(file_path):
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        print(f"  ⚪ Unchanged ({len(index)} terms)")
+        return index
+
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            questions = json.load(f)
+        index = index_questions(questions)
+    except json.JSONDecodeError as e:
+        print(f"  ❌ Error decoding JSON in {file_path.name}: {e}")
+        return None
+    except Exception as e:
+        print(f"  ❌ Error indexing {file_path.name}: {e}")
+        return None
+
+    write_if_changed(cache_path, encode(index))
+    manifest.record(file_path)
+    print(f"  ✅ Indexed {len(questions)} questions, {len(index)} terms")
+    return index
+
+def build_index(data_dir: Path, output_dir: Path, cache_dir: Path,
+                shards: int = DEFAULT_SHARDS, force: bool = False) -> None:
+    """
+    Build the sharded search index of every question file in data_dir.
+
+    output_dir gets meta.json (shard count, hash, indexed tests) and one
+    <n>.json per shard mapping each term to {test id: delta-encoded question ids}.
+    Per-file indexes are cached in cache_dir, so only changed files are
+    re-tokenized, and only shards whose bytes changed are rewritten.
+    """
+    files = list_data_files(data_dir)
+    print(f"Found {len(files)} JSON files in '{data_dir}'")
+
+    manifest = Manifest(data_dir, "search-index", TOOL_VERSION)
+    postings: Postings = {}
+    indexed: List[str] = []
+
+    for file_path in files:
+        print(f"\nIndexing: {file_path.name}")
+        index = load_file_index(file_path, cache_dir, manifest, force)
+        if index is None:
+            continue
+        indexed.append(file_path.stem)
+        for term, ids in index.items():
+            postings.setdefault(term, {})[file_path.stem] = ids
+
+    manifest.prune(files)
+    manifest.save()
+
+    for stale in sorted(cache_dir.glob('*.json')) if cache_dir.exists() else []:
+        if stale.stem not in indexed:
+            stale.unlink()
+
+    shard_terms: List[Dict[str, Dict[str, List[int]]]] = [{} for _ in range(shards)]
+    for term, by_test in postings.items():
+        shard_terms[shard_of(term, shards)][term] = {
+            test: delta_encode(ids) for test, ids in by_test.items()
+        }
+
+    written = 0
+    total_bytes = 0
+    for number, terms in enumerate(shard_terms):
+        content = encode(terms)
+        total_bytes += len(content.encode('utf-8'))
+        written += write_if_changed(output_dir / f'{number}.json', content)
+
+    for stale in sorted(output_dir.glob('*.json')):
+        if stale.name != META_NAME and not (stale.stem.isdigit() and int(stale.stem) < shards):
+            stale.unlink()
+            print(f"\n🗑️  Removed stale shard {stale.name}")
+
+    meta = {
+        "format": INDEX_FORMAT,
+        "shards": shards,
+        "hash": "fnv1a32",
+        "tokenizer": CLIENT_TOKENIZER,
+        "minTokenLength": MIN_TOKEN_LENGTH,
+        "tests": indexed,
+    }
+    written += write_if_changed(output_dir / META_NAME, encode(meta))
+
+    print(f"\n{'='*50}")
+    print(f"SUMMARY:")
+    print(f"Files indexed: {len(indexed)}/{len(files)}")
+    print(f"Distinct terms: {len(postings):,}")
+    print(f"Shards: {shards} ({total_bytes:,} bytes)")
+    print(f"Files written: {written}")
+    print(f"{'='*50}")
+
+def main():
+    """Main function to build the search index of ../src/data into ../public/search"""
+    script_dir = Path(__file__).parent.absolute()
+    data_dir = (script_dir / ".." / "src" / "data").resolve()
+
+    parser = argparse.ArgumentParser(description="Build a sharded full-text search index over all test questions")
+    parser.add_argument('--output', type=Path, default=(script_dir / ".." / "public" / "search").resolve(),
+                        help="directory for the index shards (default: public/search)")
+    parser.add_argument('--shards', type=int, default=DEFAULT_SHARDS,
+                        help="number of shards the terms are spread over (default: %(default)s)")
+    parser.add_argument('--force', action='store_true',
+                        help="re-tokenize every file instead of reusing the per-file indexes")
+    args = parser.parse_args()
+
+    if args.shards < 1:
+        parser.error("--shards must be at least 1")
+
+    print(f"Indexing all test files in: {data_dir}")
+    build_index(data_dir, args.output, script_dir / ".cache" / "search", args.shards, args.force)
+
+if __name__ == "__main__":
+    main()
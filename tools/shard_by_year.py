@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pyversion  # exits on Python < 3.10, before the imports that need it
+from manifest import list_data_files
+from output import write_if_changed
+
+YEAR_REGEX = re.compile(r'(?<!\d)(?:19|20)\d{2}(?!\d)')
+INDEX_NAME = 'index.json'
+
+def question_years(question: Dict[str, Any]) -> List[str]:
+    """Return the years mentioned in a question's tags, in order of appearance"""
+    years = []
+    for tag in question.get('tags') or []:
+        for year in YEAR_REGEX.findall(tag):
+            if year not in years:
+                years.append(year)
+    return years
+
+def build_year_index(questions: List[Dict[str, Any]]) -> Dict[str, List[int]]:
+    """
+    Build the inverted index from year to the positions of the questions tagged
+    with it. Positions keep file order, so shards list questions as the full file does.
+    """
+    index: Dict[str, List[int]] = {}
+    for position, question in enumerate(questions):
+        for year in question_years(question):
+            index.setdefault(year, []).append(position)
+    return {year: index[year] for year in sorted(index)}
+
+def encode(data: Any) -> str:
+    """Deterministic compact JSON, so unchanged shards keep the same bytes (and hashes)"""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+def shard_file(file_path: Path, output_dir: Path) -> Dict[str, Any]:
+    """
+    Split one question file into <output_dir>/<test_id>/<year>.json shards and
+    remove shards for years that no longer exist.
+    Returns the file's index entry: total question count and per-year counts.
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        questions = json.load(f)
+
+    test_dir = output_dir / file_path.stem
+    index = build_year_index(questions)
+    written = 0
+
+    for year, positions in index.items():
+        shard = [questions[position] for position in positions]
+        written += write_if_changed(test_dir / f'{year}.json', encode(shard))
+
+    if test_dir.exists():
+        for stale in sorted(test_dir.glob('*.json')):
+            if stale.stem not in index:
+                stale.unlink()
+                print(f"  🗑️  Removed stale shard {stale.name}")
+
+    if index:
+        years = ', '.join(f"{year} ({len(positions)})" for year, positions in index.items())
+        print(f"  ✅ {len(index)} year shard(s), {written} written: {years}")
+    else:
+        print(f"  ⚪ No year tags ({len(questions)} questions)")
+
+    return {
+        "total": len(questions),
+        "years": {year: len(positions) for year, positions in index.items()},
+    }
+
+def process_directory(input_dir: Path, output_dir: Path) -> None:
+    """Write per-year shards and the shard index for every question file in a directory"""
+
+    if not input_dir.exists():
+        print(f"Error: Directory '{input_dir}' not found.")
+        return
+
+    if not input_dir.is_dir():
+        print(f"Error: '{input_dir}' is not a directory.")
+        return
+
+    files = list_data_files(input_dir)
+
+    if not files:
+        print(f"No JSON files found in '{input_dir}'")
+        return
+
+    print(f"Found {len(files)} JSON files in '{input_dir}'")
+
+    shard_index: Dict[str, Any] = {}
+    for file_path in files:
+        print(f"\nProcessing: {file_path.name}")
+        try:
+            entry = shard_file(file_path, output_dir)
+        except json.JSONDecodeError as e:
+            print(f"  ❌ Error decoding JSON in {file_path.name}: {e}")
+            continue
+        except Exception as e:
+            print(f"  ❌ Error processing {file_path.name}: {e}")
+            continue
+        if entry["years"]:
+            shard_index[file_path.stem] = entry
+
+    if output_dir.exists():
+        for test_dir in sorted(d for d in output_dir.iterdir() if d.is_dir() and d.name not in shard_index):
+            for stale in test_dir.glob('*.json'):
+                stale.unlink()
+            test_dir.rmdir()
+            print(f"\n🗑️  Removed stale shards of {test_dir.name}")
+
+    index_written = write_if_changed(output_dir / INDEX_NAME, encode(shard_index))
+    total_shards = sum(len(entry["years"]) for entry in shard_index.values())
+
+    print(f"\n{'='*50}")
+    print(f"SUMMARY:")
+    print(f"Files with year tags: {len(shard_index)}/{len(files)}")
+    print(f"Total shards: {total_shards}")
+    print(f"Shard index {'updated' if index_written else 'unchanged'}: {output_dir / INDEX_NAME}")
+    print(f"{'='*50}")
+
+def main():
+    """Main function to shard ../src/data by year"""
+    script_dir = Path(__file__).parent.absolute()
+    data_dir = script_dir / ".." / "src" / "data"
+
+    parser = argparse.ArgumentParser(description="Split the test data files into per-year shards")
+    parser.add_argument('--output', type=Path, default=data_dir / "shards",
+                        help="directory for the shards and their index (default: src/data/shards)")
+    args = parser.parse_args()
+
+    print(f"Sharding all test files in: {data_dir.resolve()}")
+    process_directory(data_dir, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+import json
+import unittest
+from dataclasses import replace
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from deduplicator import Question, TestDeduplicator, TestParser
+from manifest import list_data_files
+
+DATA_DIR = (Path(__file__).parent / ".." / "src" / "data").resolve()
+
+# Every INJECT_EVERY-th question gets a reworded copy appended (see with_injected_duplicates)
+INJECT_EVERY = 7
+
+def pairwise_duplicates(questions: List[Question]) -> List[Tuple[int, int]]:
+    """The original O(n²) scan: every pair checked with questions_are_duplicate"""
+    return [
+        (i, j)
+        for i in range(len(questions))
+        for j in range(i + 1, len(questions))
+        if TestDeduplicator.questions_are_duplicate(questions[i], questions[j])
+    ]
+
+def pairwise_remove_duplicates(questions: List[Question]) -> Tuple[List[Question], int]:
+    """
+    remove_duplicates as it was before the hash index: group the pairs under
+    their lowest index, merge tags in that order and keep the leaders
+    """
+    duplicate_groups: Dict[int, int] = {}
+    indices_to_remove = set()
+    for first_idx, second_idx in pairwise_duplicates(questions):
+        leader = duplicate_groups.setdefault(first_idx, first_idx)
+        duplicate_groups[second_idx] = leader
+        indices_to_remove.add(second_idx)
+
+    tags_merges = {}
+    for idx, leader in duplicate_groups.items():
+        if leader not in tags_merges:
+            tags_merges[leader] = questions[leader].tags
+        if idx != leader:
+            tags_merges[leader] = TestDeduplicator.merge_tags(tags_merges[leader], questions[idx].tags)
+
+    unique_questions = [
+        replace(question, tags=tags_merges[i]) if i in tags_merges else question
+        for i, question in enumerate(questions)
+        if i not in indices_to_remove
+    ]
+    return unique_questions, len(indices_to_remove)
+
+def with_injected_duplicates(data: List[dict]) -> List[dict]:
+    """
+    Append copies of every INJECT_EVERY-th question that only differ in what the
+    deduplicator ignores (case, spacing, option order) plus an extra tag, so the
+    real files, which hold almost no duplicates, exercise the merging paths
+    """
+    copies = []
+    for position, item in enumerate(data[::INJECT_EVERY]):
+        copy = dict(item)
+        copy['id'] = len(data) + position + 1
+        copy['question'] = f"  {item['question'].upper()} "
+        copy['options'] = list(reversed(item['options']))
+        copy['tags'] = list(item.get('tags') or []) + [f"copia {position % 3}"]
+        copies.append(copy)
+    return data + copies
+
+def group_pairs(groups: Dict[int, List[int]]) -> List[Tuple[int, int]]:
+    """All (i, j) pairs within the groups of group_duplicates, sorted"""
+    pairs = []
+    for leader, members in groups.items():
+        group = [leader] + members
+        pairs.extend((group[a], group[b]) for a in range(len(group)) for b in range(a + 1, len(group)))
+    return sorted(pairs)
+
+class HashIndexMatchesPairwiseScan(unittest.TestCase):
+    """The hash-index grouping gives the same groups, merged tags and survivors as the pairwise scan"""
+
+    def assert_same_result(self, data: List[dict]) -> None:
+        questions = TestParser.parse_json(data)
+
+        self.assertEqual(group_pairs(TestDeduplicator.group_duplicates(questions)), pairwise_duplicates(questions))
+        self.assertEqual(TestDeduplicator.find_duplicates(questions), pairwise_duplicates(questions))
+
+        expected, expected_removed = pairwise_remove_duplicates(questions)
+        actual, actual_removed = TestDeduplicator.remove_duplicates(questions)
+        self.assertEqual(actual_removed, expected_removed)
+        self.assertEqual([q.to_dict() for q in actual], [q.to_dict() for q in expected])
+
+    def test_data_files(self):
+        files = list_data_files(DATA_DIR)
+        self.assertTrue(files, f"no data files in {DATA_DIR}")
+        for file_path in files:
+            with self.subTest(file=file_path.name):
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.assert_same_result(data)
+                self.assert_same_result(with_injected_duplicates(data))
+
+class ParseJson(unittest.TestCase):
+    """Parsing accepts what the schema-less parser before it did"""
+
+    def test_non_string_tags(self):
+        data = [{"id": 1, "question": "q", "options": ["a", "b"], "correctAnswer": 0, "tags": [2023, "final"]}]
+        self.assertEqual([q.to_dict() for q in TestParser.parse_json(data)], data)
+
+if __name__ == "__main__":
+    unittest.main()
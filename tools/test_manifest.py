@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from manifest import Manifest
+
+class ManifestSave(unittest.TestCase):
+    """Saving one tool's manifest keeps what other tools saved in the meantime"""
+
+    def test_concurrent_tools(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            data_dir = Path(tmp)
+            data_file = data_dir / "test.json"
+            data_file.write_text("[]", encoding='utf-8')
+
+            first = Manifest(data_dir, "first", "1")
+            second = Manifest(data_dir, "second", "1")
+            second.record(data_file)
+            second.save()
+            first.record(data_file)
+            first.save()
+
+            self.assertTrue(Manifest(data_dir, "first", "1").is_unchanged(data_file))
+            self.assertTrue(Manifest(data_dir, "second", "1").is_unchanged(data_file))
+
+if __name__ == "__main__":
+    unittest.main()
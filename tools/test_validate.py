@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+
+import unittest
+from pathlib import Path
+
+from deduplicator import TestDeduplicator, TestParser
+from validate import ERROR, check_question
+
+IMAGE_DIR = (Path(__file__).parent / ".." / "public" / "test").resolve()
+
+def question_with(**fields) -> dict:
+    """A valid question with an up-to-date uid, then the given fields overridden"""
+    question = {
+        "id": 1,
+        "question": "¿Cuál es la capital de Francia?",
+        "options": ["París", "Roma", "Madrid"],
+        "correctAnswer": 0,
+    }
+    question["uid"] = TestDeduplicator.content_id(TestParser.parse_json([question])[0])
+    question.update(fields)
+    return question
+
+def errors(question: dict) -> list:
+    return [message for severity, message in check_question(question, IMAGE_DIR) if severity == ERROR]
+
+class CheckQuestion(unittest.TestCase):
+    """Malformed questions are reported, not raised, even when they carry a uid"""
+
+    def test_valid_question(self):
+        self.assertEqual(errors(question_with()), [])
+
+    def test_stale_uid(self):
+        self.assertEqual(errors(question_with(question="¿Cuál es la capital de Italia?")),
+                         ["content id (uid) is out of date (run deduplicator.py or pipeline.py)"])
+
+    def test_non_string_tags(self):
+        self.assertEqual(errors(question_with(tags=[2023])), ["tags must be a list of strings"])
+
+    def test_options_not_a_list(self):
+        problems = errors(question_with(options=5))
+        self.assertIn("needs a list of at least 2 options", problems)
+        self.assertFalse(any("uid" in message for message in problems))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import sys
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import pyversion  # exits on Python < 3.10, before the imports that need it
+from deduplicator import TestDeduplicator, TestParser
+from format_code_blocks import LATEX_DISPLAY_REGEX, LATEX_INLINE_REGEX, render_hints
+from manifest import list_data_files
+from parallel import map_files
+
+CODE_FENCE = '```'
+
+# Errors break the app (wrong answers, missing images, broken layout); warnings are
+# likely mistakes that still render, such as a lone $ in "$HOME" or a repeated option
+ERROR = 'error'
+WARNING = 'warning'
+
+Problem = Tuple[str, str]
+
+@dataclass
+class Diagnostic:
+    """A problem found in a question file"""
+    file: str
+    question_id: Optional[Any]
+    message: str
+    severity: str = ERROR
+
+    def __str__(self) -> str:
+        where = f"#{self.question_id}" if self.question_id is not None else "file"
+        return f"{self.file} {where}: {self.message}"
+
+def check_delimiters(text: str) -> List[Problem]:
+    """Report unbalanced ``` fences and $/$$ LaTeX delimiters in a text"""
+    problems = []
+
+    if text.count(CODE_FENCE) % 2 != 0:
+        problems.append((ERROR, "unbalanced ``` code fence"))
+
+    # Whatever $ is left once TextRenderer's math patterns are replaced is
+    # rendered as a literal, unbalanced delimiter
+    leftover = LATEX_INLINE_REGEX.sub('', LATEX_DISPLAY_REGEX.sub('', text))
+    if '$' in leftover:
+        problems.append((WARNING, "unbalanced $ LaTeX delimiter"))
+
+    return problems
+
+def check_question(question: Any, image_dir: Path) -> List[Problem]:
+    """Return every (severity, message) problem found in one question object"""
+    if not isinstance(question, dict):
+        return [(ERROR, "not a question object")]
+
+    problems = []
+
+    text = question.get('question')
+    if not isinstance(text, str) or not text.strip():
+        problems.append((ERROR, "missing or empty question text"))
+    else:
+        problems.extend((severity, f"question text: {message}") for severity, message in check_delimiters(text))
+
+    options = question.get('options')
+    if not isinstance(options, list) or len(options) < 2:
+        problems.append((ERROR, "needs a list of at least 2 options"))
+        options = options if isinstance(options, list) else []
+
+    seen: Dict[str, int] = {}
+    for i, option in enumerate(options):
+        label = chr(ord('A') + i) if i < 26 else str(i + 1)
+        if not isinstance(option, str) or not option.strip():
+            problems.append((ERROR, f"option {label} is empty"))
+            continue
+        normalized = TestDeduplicator.normalize_text(option)
+        if normalized in seen:
+            problems.append((WARNING, f"option {label} duplicates option {chr(ord('A') + seen[normalized])}"))
+        else:
+            seen[normalized] = i
+        problems.extend((severity, f"option {label}: {message}") for severity, message in check_delimiters(option))
+
+    answer = question.get('correctAnswer')
+    if not isinstance(answer, int) or isinstance(answer, bool):
+        problems.append((ERROR, "missing or non-integer correctAnswer"))
+    elif not 0 <= answer < len(options):
+        problems.append((ERROR, f"correctAnswer {answer} is out of range for {len(options)} options"))
+
+    image = question.get('image')
+    if image is not None:
+        if not isinstance(image, str) or not image:
+            problems.append((ERROR, "image must be a non-empty file name"))
+        elif not (image_dir / image).is_file():
+            problems.append((ERROR, f"image '{image}' not found in {image_dir.name}/"))
+
+    tags = question.get('tags')
+    if tags is not None and (not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags)):
+        problems.append((ERROR, "tags must be a list of strings"))
+
+    # Stale hints would send math or code down the client's plain-text path
+    hints = question.get('render')
+    if hints is not None and hints != render_hints(question):
+        problems.append((ERROR, "render hints are out of date (run format_code_blocks.py or pipeline.py)"))
+
+    # Clients key cached question state by uid, so a stale one would serve an old question
+    # Only checked on well-formed questions: the content id can't be computed from malformed fields
+    uid = question.get('uid')
+    if uid is not None and not any(severity == ERROR for severity, _ in problems):
+        if uid != TestDeduplicator.content_id(TestParser.parse_json([question])[0]):
+            problems.append((ERROR, "content id (uid) is out of date (run deduplicator.py or pipeline.py)"))
+
+    return problems
+
+def validate_data(data: Any, file_name: str, image_dir: Path) -> List[Diagnostic]:
+    """Check decoded question data: the schema of each question and the uniqueness of ids"""
+    if not isinstance(data, list):
+        return [Diagnostic(file_name, None, "not a list of questions")]
+
+    diagnostics = []
+    seen_ids = set()
+    seen_uids: Dict[str, Any] = {}
+
+    for position, question in enumerate(data):
+        question_id = question.get('id') if isinstance(question, dict) else None
+        if question_id is None:
+            diagnostics.append(Diagnostic(file_name, None, f"question at position {position} has no id"))
+        elif not isinstance(question_id, int) or isinstance(question_id, bool):
+            diagnostics.append(Diagnostic(file_name, question_id, "id is not an integer"))
+        elif question_id in seen_ids:
+            diagnostics.append(Diagnostic(file_name, question_id, "duplicate id"))
+        seen_ids.add(question_id)
+
+        where = question_id if question_id is not None else f"@{position}"
+        uid = question.get('uid') if isinstance(question, dict) else None
+        if isinstance(uid, str) and uid in seen_uids:
+            message = f"same content as #{seen_uids[uid]} (run deduplicator.py)"
+            diagnostics.append(Diagnostic(file_name, where, message, WARNING))
+        elif isinstance(uid, str):
+            seen_uids[uid] = where
+        for severity, message in check_question(question, image_dir):
+            diagnostics.append(Diagnostic(file_name, where, message, severity))
+
+    return diagnostics
+
+def validate_file(file_path: Path, image_dir: Path) -> List[Diagnostic]:
+    """Validate one question file and print what was found"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except json.JSONDecodeError as e:
+        diagnostics = [Diagnostic(file_path.name, None, f"invalid JSON: {e}")]
+    except (OSError, UnicodeDecodeError) as e:
+        diagnostics = [Diagnostic(file_path.name, None, f"could not be read: {e}")]
+    else:
+        diagnostics = validate_data(data, file_path.name, image_dir)
+
+    for diagnostic in diagnostics:
+        print(f"  {'❌' if diagnostic.severity == ERROR else '⚠️ '} {diagnostic}")
+    if not diagnostics:
+        print(f"  ✅ Valid ({len(data)} questions)")
+
+    return diagnostics
+
+def validate_directory(data_dir: Path, image_dir: Path, jobs: int = 1) -> List[Diagnostic]:
+    """Validate every question file of a directory. Returns all diagnostics."""
+    files = list_data_files(data_dir)
+    print(f"Found {len(files)} JSON files in '{data_dir}'")
+
+    diagnostics: List[Diagnostic] = []
+    invalid_files = 0
+
+    check = partial(validate_file, image_dir=image_dir)
+    for file_path, found in map_files(check, files, jobs, header="Validating"):
+        diagnostics.extend(found)
+        invalid_files += bool(found)
+
+    errors = sum(diagnostic.severity == ERROR for diagnostic in diagnostics)
+
+    print(f"\n{'='*50}")
+    print(f"SUMMARY:")
+    print(f"Files validated: {len(files)}")
+    print(f"Files with problems: {invalid_files}")
+    print(f"Errors: {errors}")
+    print(f"Warnings: {len(diagnostics) - errors}")
+    print(f"{'='*50}")
+
+    return diagnostics
+
+def main():
+    """Main function to validate ../src/data; exits with status 1 on errors (or, with --strict, warnings)"""
+    script_dir = Path(__file__).parent.absolute()
+    data_dir = script_dir / ".." / "src" / "data"
+    image_dir = script_dir / ".." / "public" / "test"
+
+    parser = argparse.ArgumentParser(description="Check every test data file for schema and consistency problems")
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="number of files to validate in parallel (0 = one per CPU, default: 1)")
+    parser.add_argument('--strict', action='store_true',
+                        help="also fail on warnings (unbalanced $, repeated options)")
+    args = parser.parse_args()
+
+    print(f"Validating all test files in: {data_dir.resolve()}")
+    diagnostics = validate_directory(data_dir, image_dir, args.jobs)
+    if any(args.strict or diagnostic.severity == ERROR for diagnostic in diagnostics):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from manifest import list_data_files
+
+# (mtime_ns, size) of a file
+FileState = Tuple[int, int]
+
+def scan(data_dir: Path) -> Dict[Path, FileState]:
+    """Stat every question file of a data directory"""
+    states = {}
+    for file_path in list_data_files(data_dir):
+        try:
+            stat = file_path.stat()
+        except FileNotFoundError:
+            continue
+        states[file_path] = (stat.st_mtime_ns, stat.st_size)
+    return states
+
+class DirectoryWatcher:
+    """
+    Poll a data directory for question files that changed, appeared or disappeared.
+
+    A changed file is only reported once its mtime and size have stayed the same
+    for `debounce` seconds, so an editor saving in several steps triggers one run.
+    Files written by the tool itself should be passed to acknowledge() so they
+    are not reported back as changes.
+    """
+
+    def __init__(self, data_dir: Path, interval: float = 0.5, debounce: float = 0.3):
+        self.data_dir = data_dir
+        self.interval = interval
+        self.debounce = debounce
+        self.states = scan(data_dir)
+        # Files seen changing: state when first seen and when it last moved
+        self.pending: Dict[Path, Tuple[FileState, float]] = {}
+
+    def acknowledge(self, file_path: Path) -> None:
+        """Take the current state of file_path as already seen"""
+        self.pending.pop(file_path, None)
+        try:
+            stat = file_path.stat()
+        except FileNotFoundError:
+            self.states.pop(file_path, None)
+            return
+        self.states[file_path] = (stat.st_mtime_ns, stat.st_size)
+
+    def poll(self) -> Tuple[List[Path], List[Path]]:
+        """
+        Check the directory once.
+        Returns (changed, removed): settled files that changed or appeared, and files that are gone.
+        """
+        now = time.monotonic()
+        current = scan(self.data_dir)
+
+        removed = [file_path for file_path in self.states if file_path not in current]
+        for file_path in removed:
+            del self.states[file_path]
+            self.pending.pop(file_path, None)
+
+        for file_path, state in current.items():
+            if state == self.states.get(file_path):
+                self.pending.pop(file_path, None)
+                continue
+            seen = self.pending.get(file_path)
+            if seen is None or seen[0] != state:
+                self.pending[file_path] = (state, now)
+
+        changed = sorted(
+            file_path for file_path, (_, since) in self.pending.items()
+            if now - since >= self.debounce
+        )
+        for file_path in changed:
+            self.states[file_path] = self.pending.pop(file_path)[0]
+
+        return changed, removed
+
+    def watch(self) -> Iterator[Tuple[List[Path], List[Path]]]:
+        """Poll forever, yielding (changed, removed) whenever something happened"""
+        while True:
+            changed, removed = self.poll()
+            if changed or removed:
+                yield changed, removed
+            time.sleep(self.interval)